@@ -2,6 +2,8 @@
 ASGI config for bilet project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server, e.g. ``uvicorn bilet.asgi:application --workers 4``;
+the async read endpoints live under /api/async/ (library/async_views.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +14,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bilet.settings')
+# Постоянные соединения под ASGI не переиспользуются: закрываем после запроса (или DB_POOL=1)
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -52,6 +54,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # чтение с реплики для безопасных запросов каталога (library/db_router.py)
+    'library.db_router.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,38 +87,133 @@ WSGI_APPLICATION = 'bilet.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# DB_* override the local defaults. Connections: DB_POOL=1 uses psycopg's
+# pool (Django 5.1+ and psycopg[pool]; DB_POOL_MIN/DB_POOL_MAX per process,
+# the right choice under ASGI), otherwise connections persist for
+# DB_CONN_MAX_AGE seconds and are health-checked before reuse. bilet/asgi.py
+# defaults DB_CONN_MAX_AGE to 0: persistent connections are per thread and
+# leak under ASGI.
+# DB_REPLICA_HOST or DB_REPLICA_NAME adds a read replica used by
+# library.db_router for safe catalog/events/analytics requests. To try it
+# locally, point it at a second database on the same server with the
+# same data (createdb -T library library_replica) or a pg_basebackup standby.
+DB_POOL = os.getenv("DB_POOL", "") == "1"
+
+
+def _database(prefix, **defaults):
+    db = {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'library',        
-        'USER': 'postgres',       
-        'PASSWORD': 'postgres',
-        'HOST': 'localhost',      
-        'PORT': '5432',           
+        'NAME': os.getenv(f"{prefix}NAME", defaults.get("NAME", "library")),
+        'USER': os.getenv(f"{prefix}USER", defaults.get("USER", "postgres")),
+        'PASSWORD': os.getenv(f"{prefix}PASSWORD", defaults.get("PASSWORD", "postgres")),
+        'HOST': os.getenv(f"{prefix}HOST", defaults.get("HOST", "localhost")),
+        'PORT': os.getenv(f"{prefix}PORT", defaults.get("PORT", "5432")),
     }
+    if DB_POOL:
+        db["OPTIONS"] = {"pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX", "10")),
+            "timeout": 10,
+        }}
+    else:
+        db["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+        db["CONN_HEALTH_CHECKS"] = True
+    return db
+
+
+DATABASES = {
+    'default': _database("DB_"),
 }
+if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+    # по умолчанию — те же параметры, что у основной базы
+    DATABASES["replica"] = _database("DB_REPLICA_", **{k: v for k, v in DATABASES["default"].items() if k.isupper()})
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["library.db_router.ReplicaRouter"]
+# GET/HEAD under these prefixes may read from the replica (library/db_router.py).
+REPLICA_READ_PREFIXES = (
+    "/api/book-groups/",
+    "/api/events/",
+    "/api/analytics/",
+    "/api/async/book-groups/",
+    "/api/async/events/",
+)
+# After a write the client reads from the primary for this many seconds.
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "15"))
 
 AUTH_USER_MODEL = "library.User"  
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # user from token claims, no User query per request (library/authentication.py)
+        "library.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # Keyset (cursor) pagination of every list, ?page_size= up to a cap, see library/pagination.py
+    "DEFAULT_PAGINATION_CLASS": "library.pagination.KeysetPagination",
     # OpenAPI schema generation
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Background jobs run by `python manage.py run_scheduler` (one such process
+# per deployment): {job name: interval in seconds}. Alternatively drive the
+# jobs from cron/systemd via their own commands, e.g. `manage.py sweep_overdue`.
+JOB_SCHEDULE = {
+    # "sweep_overdue_loans": 300,
+    # "refresh_recommendations": 3600,
+    # "rebuild_book_stats": 86400,
+    # "deliver_notifications": 10,
+    # "send_due_reminders": 3600,
+    # "process_covers": 30,
+}
+
+# Days before Loan.due_at at which readers get a reminder (library/reminders.py).
+DUE_REMINDER_DAYS = (3, 1)
+
+# Cache for API responses (library/caching.py) and analytics reports.
+# CACHE_BACKEND: "locmem" (default, per process; tests and development),
+# "file" or "redis" (shared between workers; CACHE_LOCATION is a directory
+# or a redis:// URL, the latter needs the `redis` package).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_LOCATION = os.getenv("CACHE_LOCATION", "")
+CACHES = {
+    "default": {
+        "locmem": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "file": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_LOCATION or str(BASE_DIR / "cache"),
+        },
+        "redis": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_LOCATION or "redis://127.0.0.1:6379/1",
+        },
+    }[CACHE_BACKEND],
+}
+# Whether every worker sees the same cache; state that must reach all of them
+# (auth "stale" markers) is only relied upon when it does.
+SHARED_CACHE = CACHE_BACKEND != "locmem"
+
+# Seconds an /api/analytics/ report stays cached for the same parameters.
+ANALYTICS_CACHE_TTL = 600
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=2),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "library.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "library.authentication.ClaimsTokenRefreshSerializer",
 }
 
+# Seconds a User row stays cached for authentication and /api/auth/me/
+# (dropped on every save), and how long after issue the claims of an access
+# token are trusted without one (see library/authentication.py).
+AUTH_USER_CACHE_TTL = 300
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -167,3 +266,10 @@ SPECTACULAR_SETTINGS = {
 # Media files (user uploads)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Who sends media bytes (library/media_views.py): "" — Django itself (FileResponse,
+# Range); "nginx" — X-Accel-Redirect to MEDIA_ACCEL_PREFIX (an `internal` location
+# aliased to MEDIA_ROOT); "apache" — X-Sendfile with the full path.
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+# Paths under these prefixes are public; anything else needs library staff.
+MEDIA_PUBLIC_PREFIXES = ("covers/",)
@@ -1,12 +1,39 @@
 import argparse
-import cbsvibpyirbis as irbis
+import base64
+import gzip
+import io
+import mmap
+import queue
+import struct
 import sys
 import time
 import inspect
 import os
 import json
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import cbsvibpyirbis as irbis
+except ImportError:  # экспорт из irbis_fake работает и без клиента IRBIS
+    irbis = None
+
+
+def open_connection(conn_string):
+    """Connect to IRBIS; `fake:...` strings use the in-process irbis_fake server."""
+    if conn_string.startswith('fake:'):
+        from irbis_fake import FakeConnection
+        client = FakeConnection()
+    else:
+        if irbis is None:
+            raise RuntimeError('cbsvibpyirbis is not installed')
+        client = irbis.Connection()
+    client.parse_connection_string(conn_string)
+    client.connect()
+    return client
+
 
 def record_to_text(record):
     """Try to convert various record representations to readable text.
@@ -167,6 +194,48 @@ def safe_call(func, *args, **kwargs):
         return False, str(e)
 
 
+def get_max_mfn(client):
+    max_mfn = None
+    if hasattr(client, 'get_max_mfn'):
+        ok, res = safe_call(client.get_max_mfn)
+        if ok and isinstance(res, int):
+            max_mfn = res
+    if max_mfn is None:
+        max_mfn = getattr(client, 'max_mfn', None)
+    return max_mfn
+
+
+def fetch_record(client, mfn):
+    """Read raw bytes, parsed text and postings of one MFN; None if the MFN holds nothing."""
+    record = {'mfn': mfn}
+    if hasattr(client, 'read_raw_record'):
+        ok, raw = safe_call(client.read_raw_record, mfn)
+        if ok and raw:
+            # raw may be bytes or str
+            record['raw'] = bytes(raw) if isinstance(raw, (bytes, bytearray)) else str(raw).encode('utf-8')
+
+    # parsed record
+    if hasattr(client, 'read_record'):
+        ok, rec = safe_call(client.read_record, mfn)
+        if ok and rec:
+            record['text'] = record_to_text(rec)
+
+    # postings
+    if hasattr(client, 'read_record_postings'):
+        ok, post = safe_call(client.read_record_postings, mfn)
+        if ok and post:
+            record['postings'] = post
+    return record if len(record) > 1 else None
+
+
+def export_record(client, mfn, records_out):
+    """Write raw/text/postings artifacts of one MFN; return the number of bytes written."""
+    record = fetch_record(client, mfn)
+    if record is None:
+        return 0
+    return DirectoryWriter(records_out).write(record)
+
+
 def extract_everything(client, out_dir, quiet=False):
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -246,54 +315,14 @@ def extract_everything(client, out_dir, quiet=False):
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
     # 4) Records: use get_max_mfn if available
-    max_mfn = None
-    if hasattr(client, 'get_max_mfn'):
-        ok, res = safe_call(client.get_max_mfn)
-        if ok and isinstance(res, int):
-            max_mfn = res
-    if max_mfn is None:
-        max_mfn = getattr(client, 'max_mfn', None)
+    max_mfn = get_max_mfn(client)
 
     records_out = out_dir / 'records'
     records_out.mkdir(exist_ok=True)
 
     # try to read raw records if available, otherwise read parsed
     for mfn in range(1, (max_mfn or 0) + 1):
-        if hasattr(client, 'read_raw_record'):
-            ok, raw = safe_call(client.read_raw_record, mfn)
-            if ok and raw:
-                # raw may be bytes or str
-                path = records_out / f'{mfn}.raw'
-                try:
-                    if isinstance(raw, (bytes, bytearray)):
-                        with open(path, 'wb') as fh:
-                            fh.write(raw)
-                    else:
-                        with open(path, 'w', encoding='utf-8') as fh:
-                            fh.write(str(raw))
-                except Exception:
-                    pass
-
-        # parsed record
-        if hasattr(client, 'read_record'):
-            ok, rec = safe_call(client.read_record, mfn)
-            if ok and rec:
-                text = record_to_text(rec)
-                try:
-                    with open(records_out / f'{mfn}.txt', 'w', encoding='utf-8') as fh:
-                        fh.write(text)
-                except Exception:
-                    pass
-
-        # postings
-        if hasattr(client, 'read_record_postings'):
-            ok, post = safe_call(client.read_record_postings, mfn)
-            if ok and post:
-                try:
-                    with open(records_out / f'{mfn}.postings.json', 'w', encoding='utf-8') as fh:
-                        json.dump(post, fh, ensure_ascii=False, indent=2)
-                except Exception:
-                    pass
+        export_record(client, mfn, records_out)
 
     # 5) Other useful lists: formats, processes, users
     extras = {}
@@ -310,6 +339,485 @@ def extract_everything(client, out_dir, quiet=False):
     return out_dir
 
 
+# --- Record sinks ---------------------------------------------------------
+#
+# dir:    records/{mfn}.raw, {mfn}.txt, {mfn}.postings.json (historic layout)
+# jsonl:  records.jsonl[.gz|.zst], one JSON object per record
+# packed: records.pack, length-prefixed frames, each compressed on its own
+#
+# Uncompressed jsonl and packed get a companion `.idx` file: a fixed 12-byte
+# slot (offset, length) per MFN at position mfn * 12, so RecordArchive can
+# find any record with two mmap slices. Writers keep no per-record state in
+# memory, whatever the size of the database.
+
+INDEX_SLOT = struct.Struct('<QI')
+PACK_MAGIC = b'IRBPACK1'
+PACK_FRAME = struct.Struct('<IIB')  # mfn, payload length, codec
+CODECS = {'none': 0, 'gzip': 1, 'zstd': 2}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError('zstd compression requires the `zstandard` package')
+    return zstandard
+
+
+def compress_bytes(data, codec):
+    if codec == CODECS['gzip']:
+        return zlib.compress(data, 6)
+    if codec == CODECS['zstd']:
+        return _zstd().ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def decompress_bytes(data, codec):
+    if codec == CODECS['gzip']:
+        return zlib.decompress(data)
+    if codec == CODECS['zstd']:
+        return _zstd().ZstdDecompressor().decompress(data)
+    return data
+
+
+def record_to_json(record):
+    doc = dict(record)
+    if 'raw' in doc:
+        doc['raw'] = base64.b64encode(doc['raw']).decode('ascii')
+    return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+def record_from_json(data):
+    doc = json.loads(data)
+    if 'raw' in doc:
+        doc['raw'] = base64.b64decode(doc['raw'])
+    return doc
+
+
+class DirectoryWriter:
+    """One file per artifact under `records/` (the layout of extract_everything)."""
+
+    def __init__(self, records_out):
+        self.records_out = Path(records_out)
+        self.records_out.mkdir(parents=True, exist_ok=True)
+
+    def write(self, record):
+        mfn = record['mfn']
+        artifacts = []
+        if 'raw' in record:
+            artifacts.append((f'{mfn}.raw', record['raw']))
+        if 'text' in record:
+            artifacts.append((f'{mfn}.txt', record['text'].encode('utf-8')))
+        if 'postings' in record:
+            data = json.dumps(record['postings'], ensure_ascii=False, indent=2, default=str)
+            artifacts.append((f'{mfn}.postings.json', data.encode('utf-8')))
+        written = 0
+        for name, data in artifacts:
+            try:
+                with open(self.records_out / name, 'wb') as fh:
+                    fh.write(data)
+                written += len(data)
+            except Exception:
+                pass
+        return written
+
+    def flush(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class SingleFileWriter:
+    """Append records to one data file (+ `.idx` unless the stream is compressed)."""
+
+    suffix = None
+
+    def __init__(self, out_dir, compress='none', resume_offset=None):
+        self.codec = CODECS[compress]
+        self.path = Path(out_dir) / self.data_name(compress)
+        self.indexed = self.suffix == '.pack' or self.codec == CODECS['none']
+        if resume_offset is not None and self.path.exists():
+            if not self.indexed:
+                raise RuntimeError(f'{self.path} is a compressed stream and cannot be resumed; use --restart')
+            self.fh = open(self.path, 'r+b')
+            self.fh.truncate(resume_offset)
+            self.fh.seek(resume_offset)
+            self.index = open(self.index_path(self.path), 'r+b')
+        else:
+            self.fh = self.open_stream(open(self.path, 'wb'))
+            self.index = open(self.index_path(self.path), 'w+b') if self.indexed else None
+        self.offset = self.fh.tell() if self.indexed else 0
+
+    @classmethod
+    def data_name(cls, compress):
+        return 'records' + cls.suffix
+
+    @staticmethod
+    def index_path(path):
+        return Path(str(path) + '.idx')
+
+    def open_stream(self, fh):
+        return fh
+
+    def encode(self, record):
+        raise NotImplementedError
+
+    def write(self, record):
+        data = self.encode(record)
+        self.fh.write(data)
+        if self.indexed:
+            self.index.seek(record['mfn'] * INDEX_SLOT.size)
+            self.index.write(INDEX_SLOT.pack(self.offset, len(data)))
+            self.offset += len(data)
+        return len(data)
+
+    def flush(self):
+        """Make everything written so far durable; returns state for the checkpoint."""
+        self.fh.flush()
+        if self.indexed:
+            os.fsync(self.fh.fileno())
+            self.index.flush()
+            os.fsync(self.index.fileno())
+        return {'offset': self.offset} if self.indexed else {}
+
+    def close(self):
+        self.fh.close()
+        if self.index:
+            self.index.close()
+
+
+class JsonlWriter(SingleFileWriter):
+    suffix = '.jsonl'
+
+    @classmethod
+    def data_name(cls, compress):
+        return 'records.jsonl' + {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[compress]
+
+    def open_stream(self, fh):
+        if self.codec == CODECS['gzip']:
+            return gzip.GzipFile(fileobj=fh, mode='wb')
+        if self.codec == CODECS['zstd']:
+            return _zstd().ZstdCompressor(level=3).stream_writer(fh)
+        return fh
+
+    def encode(self, record):
+        return (record_to_json(record) + '\n').encode('utf-8')
+
+    def close(self):
+        raw = getattr(self.fh, 'fileobj', None)
+        super().close()
+        if raw is not None:
+            raw.close()
+
+
+class PackedWriter(SingleFileWriter):
+    suffix = '.pack'
+
+    def open_stream(self, fh):
+        fh.write(PACK_MAGIC)
+        return fh
+
+    def encode(self, record):
+        payload = compress_bytes(record_to_json(record).encode('utf-8'), self.codec)
+        return PACK_FRAME.pack(record['mfn'], len(payload), self.codec) + payload
+
+
+WRITERS = {'jsonl': JsonlWriter, 'packed': PackedWriter}
+
+
+class RecordArchive:
+    """Read records back from an export: O(1) `get(mfn)` through the mmap'ed index,
+    or sequential iteration (also for compressed JSONL and `records/` directories)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._data = self._index = None
+        index_path = SingleFileWriter.index_path(self.path)
+        if self.path.is_file() and index_path.exists():
+            with open(self.path, 'rb') as fh:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.path) else b''
+            with open(index_path, 'rb') as fh:
+                self._index = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(index_path) else b''
+
+    def _decode(self, chunk):
+        if self.path.suffix == '.pack':
+            mfn, length, codec = PACK_FRAME.unpack_from(chunk)
+            payload = chunk[PACK_FRAME.size:PACK_FRAME.size + length]
+            return record_from_json(decompress_bytes(payload, codec))
+        return record_from_json(chunk)
+
+    def get(self, mfn):
+        if self._index is None:
+            raise RuntimeError(f'{self.path} has no index')
+        pos = mfn * INDEX_SLOT.size
+        if mfn < 0 or pos + INDEX_SLOT.size > len(self._index):
+            return None
+        offset, length = INDEX_SLOT.unpack_from(self._index, pos)
+        if not length:
+            return None
+        return self._decode(self._data[offset:offset + length])
+
+    def __iter__(self):
+        """Yield every record once: in MFN order through the index when there is one,
+        otherwise in file order (MFN order for `records/` directories).
+
+        A resumed export re-fetches the ranges that were not checkpointed, so
+        the data file may hold stale copies of some records; the index only
+        points to the last one.
+        """
+        if self._index is not None:
+            yield from self.since(0)
+        elif self.path.is_dir():
+            yield from self._iter_directory()
+        elif self.path.suffix == '.pack':
+            with open(self.path, 'rb') as fh:
+                if fh.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                    raise RuntimeError(f'{self.path} is not a packed IRBIS export')
+                while True:
+                    header = fh.read(PACK_FRAME.size)
+                    if len(header) < PACK_FRAME.size:
+                        break
+                    mfn, length, codec = PACK_FRAME.unpack(header)
+                    payload = fh.read(length)
+                    if len(payload) < length:
+                        break  # оборванный последний кадр после сбоя
+                    yield record_from_json(decompress_bytes(payload, codec))
+        else:
+            if self.path.suffix == '.gz':
+                fh = gzip.open(self.path, 'rb')
+            elif self.path.suffix == '.zst':
+                fh = _zstd().ZstdDecompressor().stream_reader(open(self.path, 'rb'))
+                fh = io.BufferedReader(fh)
+            else:
+                fh = open(self.path, 'rb')
+            with fh:
+                for line in fh:
+                    if line.endswith(b'\n'):
+                        yield record_from_json(line)
+
+    def since(self, mfn):
+        """Yield records with an MFN above `mfn`: through the index when there is one,
+        otherwise by scanning the whole export."""
+        if self._index is not None:
+            for m in range(mfn + 1, len(self._index) // INDEX_SLOT.size):
+                record = self.get(m)
+                if record is not None:
+                    yield record
+            return
+        for record in self:
+            if int(record['mfn']) > mfn:
+                yield record
+
+    def _iter_directory(self):
+        records_out = self.path / 'records' if (self.path / 'records').is_dir() else self.path
+        mfns = sorted({int(p.name.split('.')[0]) for p in records_out.iterdir() if p.name.split('.')[0].isdigit()})
+        for mfn in mfns:
+            record = {'mfn': mfn}
+            raw = records_out / f'{mfn}.raw'
+            if raw.exists():
+                record['raw'] = raw.read_bytes()
+            text = records_out / f'{mfn}.txt'
+            if text.exists():
+                record['text'] = text.read_text(encoding='utf-8')
+            postings = records_out / f'{mfn}.postings.json'
+            if postings.exists():
+                record['postings'] = json.loads(postings.read_text(encoding='utf-8'))
+            yield record
+
+    def close(self):
+        for m in (self._data, self._index):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+
+class Checkpoint:
+    """Set of finished MFN ranges persisted in `checkpoint.json` (atomic rewrite).
+
+    `state` carries writer data that must survive a crash (the data file
+    offset up to which every record of a finished range is durable).
+    """
+
+    def __init__(self, path, params):
+        self.path = Path(path)
+        self.params = params
+        self.done = set()
+        self.state = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Restore finished ranges if the checkpoint was made with the same parameters."""
+        if not self.path.exists():
+            return False
+        with open(self.path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('params') != self.params:
+            raise RuntimeError(f'{self.path} was written with different parameters {state.get("params")}; '
+                               'use --restart to start over')
+        self.done = {tuple(r) for r in state.get('done', [])}
+        self.state = state.get('state', {})
+        return True
+
+    def mark_done(self, start, end, **state):
+        with self._lock:
+            self.done.add((start, end))
+            self.state.update(state)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'params': self.params, 'done': sorted(self.done), 'state': self.state}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+
+class Throughput:
+    """Thread-safe record/byte counters with a periodic records/s, bytes/s readout."""
+
+    def __init__(self, total, quiet=False, every=5.0):
+        self.total = total
+        self.quiet = quiet
+        self.every = every
+        self.records = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report_loop, daemon=True)
+
+    def add(self, records, nbytes):
+        with self._lock:
+            self.records += records
+            self.bytes += nbytes
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f'{self.records}/{self.total} MFN, {self.records / elapsed:.1f} records/s, '
+                f'{self.bytes / elapsed / 1024:.1f} KiB/s, {elapsed:.0f}s')
+
+    def _report_loop(self):
+        while not self._stop.wait(self.every):
+            print(self.line(), file=sys.stderr)
+
+    def __enter__(self):
+        if not self.quiet:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+
+def mfn_ranges(first, last, chunk):
+    start = first
+    while start <= last:
+        end = min(start + chunk - 1, last)
+        yield start, end
+        start = end + 1
+
+
+def export_parallel(conn_string, out_dir, workers=4, chunk=500, restart=False, quiet=False,
+                    fmt='dir', compress='none'):
+    """Export every record with `workers` connections, each taking MFN ranges of `chunk`.
+
+    Workers only talk to the server; a single writer thread appends what
+    they fetch to the chosen sink through a bounded queue, so memory stays
+    flat. A range is checkpointed in `out_dir/checkpoint.json` once all
+    its records are flushed; rerunning the same command skips finished
+    ranges, so a crashed export resumes where it stopped.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    control = open_connection(conn_string)
+    try:
+        max_mfn = get_max_mfn(control)
+    finally:
+        try:
+            control.disconnect()
+        except Exception:
+            pass
+    if not max_mfn:
+        raise RuntimeError('server did not report max MFN')
+    last_mfn = max_mfn
+
+    checkpoint = Checkpoint(out_dir / 'checkpoint.json', {'chunk': chunk, 'format': fmt, 'compress': compress})
+    if restart and checkpoint.path.exists():
+        checkpoint.path.unlink()
+    elif checkpoint.load() and not quiet:
+        print(f'Resuming: {len(checkpoint.done)} ranges already exported', file=sys.stderr)
+
+    if fmt == 'dir':
+        writer = DirectoryWriter(out_dir / 'records')
+    else:
+        resume_offset = checkpoint.state.get('offset', 0) if checkpoint.done else None
+        writer = WRITERS[fmt](out_dir, compress, resume_offset=resume_offset)
+
+    pending = [r for r in mfn_ranges(1, last_mfn, chunk) if r not in checkpoint.done]
+    items = queue.Queue(maxsize=max(workers, 1) * 64)
+    local = threading.local()
+    clients = []
+    clients_lock = threading.Lock()
+    failure = []
+
+    def worker_client():
+        if not hasattr(local, 'client'):
+            local.client = open_connection(conn_string)
+            with clients_lock:
+                clients.append(local.client)
+        return local.client
+
+    def export_range(start, end):
+        client = worker_client()
+        for mfn in range(start, end + 1):
+            if failure:
+                return
+            record = fetch_record(client, mfn)
+            if record is not None:
+                items.put(record)
+        items.put(('done', start, end))
+
+    def write_loop(meter):
+        written = {}
+        while True:
+            item = items.get()
+            if item is None:
+                return
+            if failure:
+                continue  # дочитываем очередь, чтобы воркеры не зависли на put()
+            try:
+                if isinstance(item, tuple):
+                    _, start, end = item
+                    checkpoint.mark_done(start, end, **writer.flush())
+                    meter.add(end - start + 1, written.pop(start, 0))
+                else:
+                    key = (item['mfn'] - 1) // chunk * chunk + 1
+                    written[key] = written.get(key, 0) + writer.write(item)
+            except BaseException as exc:
+                failure.append(exc)
+
+    with Throughput(sum(end - start + 1 for start, end in pending), quiet=quiet) as meter:
+        writer_thread = threading.Thread(target=write_loop, args=(meter,), name='irbis-writer')
+        writer_thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for future in [pool.submit(export_range, start, end) for start, end in pending]:
+                    future.result()
+        finally:
+            items.put(None)
+            writer_thread.join()
+            writer.close()
+            for client in clients:
+                try:
+                    client.disconnect()
+                except Exception:
+                    pass
+    if failure:
+        raise failure[0]
+    if not quiet:
+        print(f'Export complete: {meter.line()}', file=sys.stderr)
+    return meter
+
+
 def main():
     parser = argparse.ArgumentParser(description='Export IRBIS records as readable text')
     parser.add_argument('--conn', '-c',
@@ -318,11 +826,22 @@ def main():
     parser.add_argument('--out', '-o', default='irbis_records.txt', help='Output file')
     parser.add_argument('--max-fail', type=int, default=50, help='Stop after this many consecutive missing MFNs')
     parser.add_argument('--quiet', action='store_true', help='Reduce stdout progress')
+    parser.add_argument('--export-dir', help='Export all records into this directory with parallel connections')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel connections for --export-dir')
+    parser.add_argument('--chunk', type=int, default=500, help='MFNs per work unit / checkpoint for --export-dir')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of a previous --export-dir run')
+    parser.add_argument('--format', choices=('dir', 'jsonl', 'packed'), default='dir',
+                        help='--export-dir layout: file per artifact, one JSONL file or a packed archive')
+    parser.add_argument('--compress', choices=tuple(CODECS), default='none',
+                        help='Compression for jsonl (whole stream, no index) or packed (per record)')
     args = parser.parse_args()
 
-    client = irbis.Connection()
-    client.parse_connection_string(args.conn)
-    client.connect()
+    if args.export_dir:
+        export_parallel(args.conn, args.export_dir, workers=args.workers, chunk=args.chunk,
+                        restart=args.restart, quiet=args.quiet, fmt=args.format, compress=args.compress)
+        return
+
+    client = open_connection(args.conn)
 
     # write a small metadata file showing what the client/server exposes
     try:
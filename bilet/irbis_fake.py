@@ -0,0 +1,125 @@
+"""In-process stand-in for an IRBIS64 server, for testing irbis.py exports.
+
+`FakeConnection` mimics the subset of `cbsvibpyirbis.Connection` used by
+irbis.py: parse_connection_string/connect/disconnect, get_max_mfn,
+read_record, read_raw_record and read_record_postings. Records are
+generated deterministically from the MFN, so two runs export identical
+data. Use it through irbis.py with a connection string such as
+
+    fake:records=10000;latency=0.002;deleted=97
+
+`latency` is slept on every call to imitate a network round trip and
+`deleted` makes every N-th MFN a logically deleted record.
+"""
+import threading
+import time
+
+
+class FakeField:
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+    def __repr__(self):
+        return f'{self.tag}#{self.value}'
+
+
+class FakeRecord:
+    def __init__(self, mfn, version, fields):
+        self.mfn = mfn
+        self.version = version
+        self.fields = fields
+
+    def to_text(self):
+        return '\n'.join(f'{f.tag}#{f.value}' for f in self.fields)
+
+
+SURNAMES = ('Толстой', 'Чехов', 'Пушкин', 'Гоголь', 'Бунин', 'Лесков', 'Тургенев')
+SUBJECTS = ('Художественная литература', 'История', 'Поэзия', 'Детская литература', 'Философия')
+
+
+def make_record(mfn):
+    """Deterministic RDR-like record: title, authors, ISBN, imprint, subjects, copies."""
+    fields = [
+        FakeField(10, f'^a978-5-{mfn % 100000:05d}-{mfn % 1000:03d}-{mfn % 10}'),
+        FakeField(200, f'^aКнига {mfn}^eсборник {mfn % 7}'),
+        FakeField(210, f'^cИздательство {mfn % 13}^d{1950 + mfn % 70}'),
+        FakeField(331, f'^aАннотация к записи {mfn}'),
+        FakeField(700, f'^a{SURNAMES[mfn % len(SURNAMES)]}^bИ. И.'),
+    ]
+    if mfn % 3 == 0:
+        fields.append(FakeField(701, f'^a{SURNAMES[(mfn + 1) % len(SURNAMES)]}^bА. А.'))
+    fields.append(FakeField(606, f'^a{SUBJECTS[mfn % len(SUBJECTS)]}'))
+    for n in range(mfn % 3 + 1):
+        fields.append(FakeField(910, f'^a0^b{mfn * 10 + n}^dАб'))
+    return FakeRecord(mfn, 1 + mfn % 5, fields)
+
+
+class FakeConnection:
+    def __init__(self, records=1000, latency=0.0, deleted=0):
+        self.records = records
+        self.latency = latency
+        self.deleted = deleted
+        self.connected = False
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def parse_connection_string(self, text):
+        if text.startswith('fake:'):
+            text = text[len('fake:'):]
+        for part in text.split(';'):
+            if '=' not in part:
+                continue
+            key, value = part.split('=', 1)
+            key = key.strip().lower()
+            if key == 'records':
+                self.records = int(value)
+            elif key == 'latency':
+                self.latency = float(value)
+            elif key == 'deleted':
+                self.deleted = int(value)
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def _round_trip(self):
+        if not self.connected:
+            raise ConnectionError('not connected')
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _exists(self, mfn):
+        if mfn < 1 or mfn > self.records:
+            return False
+        return not (self.deleted and mfn % self.deleted == 0)
+
+    def get_max_mfn(self):
+        self._round_trip()
+        # как и в IRBIS, max_mfn — следующий свободный номер
+        return self.records + 1
+
+    def read_record(self, mfn):
+        self._round_trip()
+        if not self._exists(mfn):
+            return None
+        return make_record(mfn)
+
+    def read_raw_record(self, mfn):
+        self._round_trip()
+        if not self._exists(mfn):
+            return None
+        record = make_record(mfn)
+        lines = [f'{mfn}#0', f'0#{record.version}']
+        lines += [f'{f.tag}#{f.value}' for f in record.fields]
+        return '\x1f'.join(lines).encode('utf-8')
+
+    def read_record_postings(self, mfn):
+        self._round_trip()
+        if not self._exists(mfn):
+            return None
+        return [{'mfn': mfn, 'tag': 200, 'occurrence': 1, 'count': 1, 'text': f'КНИГА {mfn}'}]
@@ -1,6 +1,6 @@
 # library/admin.py
 from django.contrib import admin
-from .models import User, Author, Genre, BookGroup, BookCopy, Loan, RenewRequest, Event, Notification
+from .models import User, Author, Genre, BookGroup, BookCopy, Loan, RenewRequest, Event, EventWaitlist, Notification, NotificationOutbox, JobRun, ImportState
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 @admin.register(User)
@@ -18,4 +18,13 @@ admin.site.register(BookCopy)
 admin.site.register(Loan)
 admin.site.register(RenewRequest)
 admin.site.register(Event)
+admin.site.register(EventWaitlist)
 admin.site.register(Notification)
+admin.site.register(NotificationOutbox)
+admin.site.register(ImportState)
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ("name", "started_at", "duration_ms", "rows")
+    list_filter = ("name",)
@@ -0,0 +1,146 @@
+# library/analytics.py
+"""Aggregates behind AnalyticsViewSet.
+
+Every report is one grouped query over a half-open [start, end) range;
+loan reports filter on issued_at, which the covering loan_issued_idx
+serves without touching the table for most columns. Results are plain
+lists of dicts so the view can cache them as they are.
+"""
+from django.db.models import Avg, Count, F, Func, Max, Q, Window
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Event, Loan, RenewRequest
+
+BUCKETS = ("day", "week", "month")
+
+
+class WindowSum(Func):
+    """SUM(<aggregate>): Django's Sum refuses an aggregate argument."""
+    function = "SUM"
+    window_compatible = True
+
+
+class GroupWindow(Window):
+    """Window over the aggregates of a grouped query, e.g. SUM(COUNT(*)) OVER (ORDER BY period).
+
+    Its ORDER BY uses grouped columns only, so unlike a plain Window it must
+    not add itself to GROUP BY.
+    """
+
+    def get_group_by_cols(self):
+        return []
+
+
+def group_total(aggregate, order_by=None):
+    """Running total of `aggregate` along `order_by`, or the grand total without it."""
+    return GroupWindow(WindowSum(aggregate), order_by=order_by)
+
+
+def _days(duration):
+    return round(duration.total_seconds() / 86400, 2) if duration is not None else None
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _loans(start, end):
+    return Loan.objects.filter(issued_at__gte=start, issued_at__lt=end)
+
+
+def loans_per_period(start, end, bucket):
+    """Loans and distinct readers per bucket, with a running total over the range."""
+    rows = (
+        _loans(start, end).annotate(period=Trunc("issued_at", bucket)).values("period")
+        .annotate(
+            loans=Count("id"),
+            readers=Count("reader_id", distinct=True),
+            running_total=group_total(Count("id"), order_by=F("period").asc()),
+        )
+        .order_by("period")
+    )
+    return list(rows)
+
+
+def overdue_rate(start, end, bucket):
+    """Share of loans issued in each bucket that came back late or are still overdue."""
+    now = timezone.now()
+    returned_late = Q(returned_at__gt=F("due_at"))
+    still_late = Q(returned_at__isnull=True, due_at__lt=now)
+    rows = (
+        _loans(start, end).annotate(period=Trunc("issued_at", bucket)).values("period")
+        .annotate(
+            loans=Count("id"),
+            returned_late=Count("id", filter=returned_late),
+            still_overdue=Count("id", filter=still_late),
+        )
+        .order_by("period")
+    )
+    return [
+        {**row, "overdue_rate": _ratio(row["returned_late"] + row["still_overdue"], row["loans"])}
+        for row in rows
+    ]
+
+
+def loan_duration(start, end, bucket):
+    """Average and longest time (in days) between issue and return of returned loans."""
+    length = F("returned_at") - F("issued_at")
+    rows = (
+        _loans(start, end).filter(returned_at__isnull=False)
+        .annotate(period=Trunc("issued_at", bucket)).values("period")
+        .annotate(returned=Count("id"), avg=Avg(length), longest=Max(length))
+        .order_by("period")
+    )
+    return [
+        {"period": r["period"], "returned": r["returned"], "avg_days": _days(r["avg"]), "max_days": _days(r["longest"])}
+        for r in rows
+    ]
+
+
+def renewals_per_book(start, end, limit):
+    """Books with the most renewal requests in the range."""
+    rows = (
+        RenewRequest.objects.filter(requested_at__gte=start, requested_at__lt=end)
+        .values(book_group_id=F("loan__copy__book_group_id"), title=F("loan__copy__book_group__title"))
+        .annotate(
+            requests=Count("id"),
+            approved=Count("id", filter=Q(status="approved")),
+            rejected=Count("id", filter=Q(status="rejected")),
+        )
+        .order_by("-requests", "book_group_id")
+    )
+    return list(rows[:limit])
+
+
+def event_attendance(start, end):
+    """Registered and waitlisted readers per event starting in the range."""
+    rows = (
+        Event.objects.filter(start_at__gte=start, start_at__lt=end)
+        .values("id", "title", "start_at", "capacity", registered=F("participants_count"))
+        .annotate(waitlisted=Count("waitlist"))
+        .order_by("start_at", "id")
+    )
+    return [
+        {**row, "fill_rate": _ratio(row["registered"], row["capacity"]) if row["capacity"] > 0 else None}
+        for row in rows
+    ]
+
+
+def genre_popularity(start, end, limit):
+    """Loans and readers per genre, with each genre's share of all genre-tagged loans."""
+    rows = (
+        _loans(start, end).filter(copy__book_group__genres__isnull=False)
+        .values(genre_id=F("copy__book_group__genres"), name=F("copy__book_group__genres__name"))
+        .annotate(
+            loans=Count("id"),
+            readers=Count("reader_id", distinct=True),
+            all_loans=group_total(Count("id")),
+        )
+        .order_by("-loans", "genre_id")
+    )
+    return [
+        {"genre_id": r["genre_id"], "name": r["name"], "loans": r["loans"], "readers": r["readers"],
+         "share": _ratio(r["loans"], r["all_loans"])}
+        for r in rows[:limit]
+    ]
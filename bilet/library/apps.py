@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LibraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'library'
+
+    def ready(self):
+        # Планировщик задач здесь не запускаем: ready() выполняется в каждом процессе
+        # (воркеры, migrate, shell), JOB_SCHEDULE обслуживает manage.py run_scheduler
+        from . import signals  # noqa: F401
@@ -0,0 +1,131 @@
+# library/async_views.py
+"""Async variants of the hottest read endpoints, under /api/async/.
+
+Plain Django async views (DRF views are synchronous): under an ASGI
+server (`uvicorn bilet.asgi:application`) a request waiting for the
+database or the cache does not hold a worker. They answer with the same
+serializers, permissions (authenticated users), JWT claims
+authentication, response cache and KeysetPagination as their synchronous
+counterparts, so the output is the same. Under WSGI they still work, each in its own
+event loop.
+
+Compare both deployments with `manage.py bench_http`.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import ClaimsJWTAuthentication, afull_user
+from .caching import acache_response
+from .models import BookGroup, Event, Loan
+from .pagination import KeysetPagination, SearchPagination
+from .serializers import BookGroupSerializer, EventSerializer, LOAN_ROW_FIELDS, UserSerializer, loan_rows
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def async_api(view):
+    """GET/HEAD only, JWT-authenticated; the view gets `request.user` and returns data for JSON."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return _json({"detail": f'Метод "{request.method}" не разрешен.'}, status=405)
+        try:
+            result = await ClaimsJWTAuthentication().aauthenticate(request)
+        except AuthenticationFailed as e:
+            # как в обработчике исключений DRF: simplejwt отдаёт detail словарём
+            return _json(e.detail if isinstance(e.detail, (list, dict)) else {"detail": e.detail}, status=401)
+        if result is None:
+            return _json({"detail": NotAuthenticated.default_detail}, status=401)
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _data(serializer):
+    # .data синхронный: при отсутствии аннотаций (нет строки BookGroupStats) сериализатор
+    # сам ходит в базу, поэтому считаем его в потоке запроса
+    return await sync_to_async(lambda: serializer.data)()
+
+
+def _int(request, name, default, upper):
+    try:
+        value = int(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+    return max(1, min(value, upper))
+
+
+async def _list(request, qs, serializer_class):
+    """`qs` serialized like a synchronous list endpoint: one keyset page."""
+    paginator = KeysetPagination()
+    rows = paginator.page([obj async for obj in paginator.keyset(qs, request)])
+    return paginator.get_paginated_data(await _data(serializer_class(rows, many=True, context={"request": request})))
+
+
+def _book_groups():
+    return BookGroup.objects.with_stats().prefetch_related("authors", "genres")
+
+
+@async_api
+@acache_response(ttl=300, scopes=("catalog",))
+async def book_groups(request):
+    return _json(await _list(request, _book_groups(), BookGroupSerializer))
+
+
+@async_api
+@acache_response(ttl=300, scopes=("catalog",))
+async def book_group(request, pk):
+    book = await _book_groups().filter(pk=pk).afirst()
+    if book is None:
+        return _json({"detail": "Не найдено."}, status=404)
+    return _json(await _data(BookGroupSerializer(book, context={"request": request})))
+
+
+@async_api
+async def book_group_search(request):
+    """Same ranking and limit/offset paging as /api/book-groups/search/."""
+    q = request.GET.get("q", "").strip()
+    if not q:
+        return _json({"q": "required"}, status=400)
+    limit = _int(request, "limit", SearchPagination.default_limit, SearchPagination.max_limit)
+    try:
+        offset = max(0, int(request.GET.get("offset", 0)))
+    except ValueError:
+        offset = 0
+    rows = [b async for b in _book_groups().search(q)[offset:offset + limit + 1]]
+    url = replace_query_param(request.build_absolute_uri(), "limit", limit)
+    previous = None
+    if offset > 0:
+        previous = replace_query_param(url, "offset", offset - limit) if offset > limit else remove_query_param(url, "offset")
+    return _json({
+        "next": replace_query_param(url, "offset", offset + limit) if len(rows) > limit else None,
+        "previous": previous,
+        "results": await _data(BookGroupSerializer(rows[:limit], many=True, context={"request": request})),
+    })
+
+
+@async_api
+@acache_response(ttl=60, scopes=("events",))
+async def events(request):
+    return _json(await _list(request, Event.objects.all(), EventSerializer))
+
+
+@async_api
+async def active_loans(request):
+    loans = Loan.objects.filter(reader=request.user, status__in=("active", "overdue")).values(*LOAN_ROW_FIELDS)
+    return _json(loan_rows([row async for row in loans]))
+
+
+@async_api
+async def me(request):
+    user = await afull_user(request.user)
+    if user is None:
+        return _json({"detail": "Пользователь не найден"}, status=401)
+    return _json(UserSerializer(user).data)
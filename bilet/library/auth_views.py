@@ -1,20 +1,19 @@
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework.exceptions import PermissionDenied
-from library.models import User
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.backends import TokenBackend
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import AccessToken, TokenError
+from .authentication import ClaimsJWTAuthentication, ClaimsTokenObtainPairSerializer, full_user
 from .serializers import UserSerializer
 from rest_framework.permissions import IsAuthenticated
 
 
-class ReaderTokenObtainPairSerializer(TokenObtainPairSerializer):
+class ReaderTokenObtainPairSerializer(ClaimsTokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -24,7 +23,7 @@ class ReaderTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
-class LibraryTokenObtainPairSerializer(TokenObtainPairSerializer):
+class LibraryTokenObtainPairSerializer(ClaimsTokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -33,7 +32,7 @@ class LibraryTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return data
     
-class AdminTokenObtainPairSerializer(TokenObtainPairSerializer):
+class AdminTokenObtainPairSerializer(ClaimsTokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -69,11 +68,10 @@ class InspectTokenView(APIView):
                 "error": str(e)
             }, status=status.HTTP_200_OK)
 
-        # Если токен валиден — извлекаем user_id
-        user_id = token.get("user_id")
+        # Если токен валиден — пользователь из claims (или кеша), как при обычном запросе
         try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
+            user = ClaimsJWTAuthentication().get_user(token)
+        except (AuthenticationFailed, InvalidToken):
             return Response({
                 "valid": False,
                 "error": "User does not exist"
@@ -96,6 +94,9 @@ class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
+        user = full_user(request.user)
+        if user is None:
+            # пользователя удалили после выдачи токена
+            raise AuthenticationFailed("Пользователь не найден", code="user_not_found")
         data = UserSerializer(user).data
         return Response(data)
\ No newline at end of file
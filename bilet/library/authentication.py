@@ -0,0 +1,173 @@
+# library/authentication.py
+"""JWT authentication without a User query per request.
+
+Login and refresh put CLAIMS (role, names, ticket number) into the signed
+token, and `ClaimsJWTAuthentication` builds an unsaved User from them: role
+checks and `reader=request.user` filters need nothing else. Such a user is
+incomplete (no email, phone, birth date, password); use `full_user` where
+the whole row is needed.
+
+Claims are trusted only for AUTH_USER_CACHE_TTL after the token was
+issued, and only with a shared cache (SHARED_CACHE): saving or deleting a
+User leaves a "stale" marker there, and tokens issued before it are no
+longer trusted. Otherwise the user comes from a cache entry that lives
+AUTH_USER_CACHE_TTL or from the database, so a demoted or deactivated
+user, even one changed by a bulk `update()` that sends no signals, keeps
+the old role for at most AUTH_USER_CACHE_TTL seconds.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+CLAIMS = ("role", "username", "first_name", "last_name", "ticket_number")
+
+
+def _user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def _stale_key(user_id):
+    return f"auth:stale:{user_id}"
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def claims_user(token):
+    """Unsaved User with the id and CLAIMS of `token`; never call save() on it."""
+    # simplejwt кладёт id строкой; приводим, чтобы user.pk == obj.user_id работало
+    pk = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+    user = User(pk=pk, **{claim: token[claim] for claim in CLAIMS})
+    user._state.adding = False
+    user.from_claims = True
+    return user
+
+
+def load_user(user_id):
+    """User row from the short-lived cache or the database; None if there is none."""
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+    return user
+
+
+def full_user(user):
+    """The complete User behind `request.user` (cached), loaded only for claims-built users."""
+    if getattr(user, "from_claims", False):
+        return load_user(user.pk)
+    return user
+
+
+async def afull_user(user):
+    """full_user() for async views."""
+    if not getattr(user, "from_claims", False):
+        return user
+    key = _user_key(user.pk)
+    full = await cache.aget(key)
+    if full is None:
+        full = await User.objects.filter(pk=user.pk).afirst()
+        if full is not None:
+            await cache.aset(key, full, settings.AUTH_USER_CACHE_TTL)
+    return full
+
+
+def forget_user(user_id):
+    """After commit: drop the cached row and distrust tokens issued so far."""
+    def forget():
+        # дольше AUTH_USER_CACHE_TTL claims и так не принимаются
+        cache.set(_stale_key(user_id), time.time(), settings.AUTH_USER_CACHE_TTL)
+        cache.delete(_user_key(user_id))
+    transaction.on_commit(forget)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts a recent token's CLAIMS unless the user changed since it was issued."""
+
+    def _keys(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        return _stale_key(user_id), _user_key(user_id)
+
+    def _trusted(self, validated_token, found):
+        """Claims-built user if the token is still trusted, else the cached row or None."""
+        stale_key, user_key = self._keys(validated_token)
+        issued_at = validated_token.get("iat", 0)
+        stale_since = found.get(stale_key)
+        # без общего кэша маркер виден только тому процессу, где пользователя сохранили
+        fresh = (
+            settings.SHARED_CACHE
+            and time.time() - issued_at < settings.AUTH_USER_CACHE_TTL
+            and (stale_since is None or issued_at > stale_since)
+        )
+        if fresh and all(claim in validated_token for claim in CLAIMS):
+            return claims_user(validated_token)
+        return found.get(user_key)
+
+    def get_user(self, validated_token):
+        if validated_token.get(api_settings.USER_ID_CLAIM) is None:
+            return super().get_user(validated_token)
+        keys = self._keys(validated_token)
+        user = self._trusted(validated_token, cache.get_many(keys))
+        if user is None:
+            # старый токен без claims или пользователь менялся: проверка активности и т. п. в базе
+            user = super().get_user(validated_token)
+            cache.set(keys[1], user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    async def aget_user(self, validated_token):
+        """get_user() for async views: the cache through its async API, the database only on a miss."""
+        if validated_token.get(api_settings.USER_ID_CLAIM) is None:
+            return await sync_to_async(super().get_user)(validated_token)
+        keys = self._keys(validated_token)
+        user = self._trusted(validated_token, await cache.aget_many(keys))
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+            await cache.aset(keys[1], user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: (user, token) or None without an Authorization header."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user's current CLAIMS, not the ones from login."""
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = User.objects.filter(pk=self.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is not None:
+            add_claims(access, user)
+        return access
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
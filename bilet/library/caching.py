@@ -0,0 +1,196 @@
+# library/caching.py
+"""Response cache for hot read endpoints.
+
+`@cache_response(ttl, scopes)` wraps a viewset handler: the rendered JSON
+is stored under a key built from the request URL and the current version
+of every scope the endpoint depends on ("catalog", "events", ...).
+Signals call `invalidate(scope)` after a write commits, which bumps the
+version so old entries are simply never read again and expire by TTL.
+Versions start from the clock (ns), so a version key that was evicted
+comes back as a value no earlier entry was stored under.
+
+Every cached response carries an ETag; a matching If-None-Match gets 304
+without touching the database. `@conditional(validators)` answers 304
+from a cheap query (row count, max updated_at) when the cache misses.
+Only JSON responses are cached, so the browsable API always renders fresh. The backend is whatever CACHES
+configures (see CACHE_BACKEND in settings).
+
+Bodies built from the read replica (library/db_router.py) are cached
+under their own keys and for at most REPLICA_STICKY_SECONDS: right after
+a write bumps the version the replica may still lag, and such a body
+must neither reach a client that reads its own writes from the primary
+nor outlive the lag by a full TTL.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .db_router import REPLICA, reading_replica
+
+PREFIX = "resp"
+
+
+def _version_key(scope):
+    return f"{PREFIX}:v:{scope}"
+
+
+def _seed(key):
+    """Create a missing version key; never a constant, or entries from before an eviction come back."""
+    seed = time.time_ns()
+    cache.add(key, seed, None)
+    return cache.get(key, seed)
+
+
+def versions(scopes):
+    keys = [_version_key(s) for s in scopes]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else _seed(key) for key in keys]
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # ключа ещё нет (или его вытеснили): новая версия от часов и так не совпадёт со старыми
+            _seed(key)
+
+
+def invalidate(*scopes):
+    """Bump `scopes` once the current transaction commits (at once in autocommit)."""
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+async def _aseed(key):
+    seed = time.time_ns()
+    await cache.aadd(key, seed, None)
+    return await cache.aget(key, seed)
+
+
+async def aversions(scopes):
+    """versions() for async views."""
+    keys = [_version_key(s) for s in scopes]
+    found = await cache.aget_many(keys)
+    return [found[key] if key in found else await _aseed(key) for key in keys]
+
+
+def _response_key(request, scopes, scope_versions):
+    parts = [request.get_host(), request.get_full_path(), *map(str, scope_versions)]
+    if reading_replica():
+        parts.append(REPLICA)
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return f"{PREFIX}:{'.'.join(scopes)}:{digest}"
+
+
+def _ttl(ttl):
+    # реплика могла ещё не догнать запись, после которой сменилась версия
+    return min(ttl, settings.REPLICA_STICKY_SECONDS) if reading_replica() else ttl
+
+
+def response_key(request, scopes):
+    return _response_key(request, scopes, versions(scopes))
+
+
+def _cached(request, etag, last_modified, content, content_type):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def cache_response(ttl, scopes):
+    """Cache a GET handler's JSON response for `ttl` seconds, keyed by URL and `scopes` versions.
+
+    Runs after DRF authentication and permission checks, so only the
+    rendered body is shared; endpoints whose output depends on the user
+    must not use it. Validators set by an inner @conditional are kept.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != "GET" or getattr(request.accepted_renderer, "format", None) != "json":
+                return handler(self, request, *args, **kwargs)
+            key = response_key(request, scopes)
+            hit = cache.get(key)
+            if hit is not None:
+                return _cached(request, *hit)
+
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            etag = response.get("ETag") or f'"{hashlib.md5(content).hexdigest()}"'
+            last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+            hit = (etag, last_modified, content, "application/json")
+            cache.set(key, hit, _ttl(ttl))
+            return _cached(request, *hit)
+        return wrapper
+    return decorator
+
+
+def acache_response(ttl, scopes):
+    """cache_response() for async views that return JSON (library/async_views.py).
+
+    Same scopes, versions and ETags as the synchronous endpoints, so both
+    are invalidated by the same writes.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return await view(request, *args, **kwargs)
+            key = _response_key(request, scopes, await aversions(scopes))
+            hit = await cache.aget(key)
+            if hit is not None:
+                return _cached(request, *hit)
+
+            response = await view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            hit = (f'"{hashlib.md5(response.content).hexdigest()}"', None, response.content, "application/json")
+            await cache.aset(key, hit, _ttl(ttl))
+            return _cached(request, *hit)
+        return wrapper
+    return decorator
+
+
+def conditional(validators):
+    """Answer conditional GETs before the handler builds a body.
+
+    `validators(view, request, *args, **kwargs)` returns (etag, last_modified
+    datetime) computed with cheap queries, or (None, None) to skip, e.g.
+    when the object does not exist and the handler should 404.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != "GET":
+                return handler(self, request, *args, **kwargs)
+            etag, last_modified = validators(self, request, *args, **kwargs)
+            if etag is None and last_modified is None:
+                return handler(self, request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if etag is not None:
+                    response["ETag"] = etag
+                if timestamp is not None:
+                    response["Last-Modified"] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+# library/covers.py
+"""Resized derivatives of uploaded covers (BookGroup and Event).
+
+Uploads stay untouched in covers/. The `process_covers` job (or the
+`build_cover_variants` command, which spreads the work over CPU cores)
+finds covers whose `cover_variants` were built from another file, renders
+every size in VARIANTS as WebP and JPEG and stores them under the SHA-256
+of the original: covers/v/ab/<hash>-thumb.webp. Identical uploads share
+one set of files, and files that already exist are not rendered again.
+
+`cover_variants` keeps the storage names together with the source file
+name, so a new upload is picked up by the next run and its old variants
+are never served for it. Serializers expose the URLs via `variant_urls`.
+"""
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.db.models.fields.json import KT
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .caching import invalidate
+from .models import BookGroup, Event
+
+# (ширина, высота) рамки: картинка вписывается с сохранением пропорций и не увеличивается
+VARIANTS = {
+    "thumb": (150, 225),
+    "medium": (480, 720),
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# Варианты именуются по содержимому и не перезаписываются: их можно кэшировать навсегда
+VARIANT_DIR = "covers/v/"
+MODELS = ((BookGroup, "catalog"), (Event, "events"))
+CHUNK = 100
+
+
+def _name(digest, variant, ext):
+    return f"{VARIANT_DIR}{digest[:2]}/{digest}-{variant}.{ext}"
+
+
+def _load(data):
+    image = Image.open(BytesIO(data))
+    # JPEG декодируется сразу в уменьшенном масштабе, не меньше самого большого варианта
+    side = max(max(size) for size in VARIANTS.values())
+    image.draft("RGB", (side, side))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        # Image.has_transparency_data есть только с Pillow 10.1
+        transparent = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+    return image
+
+
+def _encode(image, ext):
+    fmt, options = FORMATS[ext]
+    if fmt == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buf = BytesIO()
+    image.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def render(source):
+    """Build every variant of the stored file `source`; returns the cover_variants dict.
+
+    Touches storage only, never the database, so the backfill command can
+    run it in worker processes. Unreadable images are recorded with an
+    "error" key and not retried until the cover changes.
+    """
+    try:
+        with default_storage.open(source, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        variants = {"source": source, "hash": digest}
+        image = None
+        for variant, size in VARIANTS.items():
+            names = {}
+            for ext in FORMATS:
+                name = _name(digest, variant, ext)
+                if not default_storage.exists(name):
+                    if image is None:
+                        image = _load(data)
+                    resized = image.copy()
+                    resized.thumbnail(size, Image.LANCZOS)
+                    name = default_storage.save(name, ContentFile(_encode(resized, ext)))
+                names[ext] = name
+            variants[variant] = names
+    except (OSError, Image.DecompressionBombError) as e:
+        return {"source": source, "error": str(e)}
+    return variants
+
+
+def pending(model):
+    """Rows of `model` with a cover whose variants are missing or were built from another file."""
+    return (
+        model.objects.exclude(cover_image="").exclude(cover_image__isnull=True)
+        .annotate(variants_source=KT("cover_variants__source"))
+        .filter(Q(variants_source__isnull=True) | ~Q(variants_source=F("cover_image")))
+    )
+
+
+def process_covers(chunk=CHUNK, mapper=map):
+    """Render variants of every pending cover; returns the number of rows updated.
+
+    `mapper` runs `render` over a chunk of file names (e.g. a process
+    pool's map). A row is only updated if its cover is still the file
+    that was rendered.
+    """
+    updated = 0
+    for model, scope in MODELS:
+        last = 0
+        changed = 0
+        while True:
+            rows = list(pending(model).filter(pk__gt=last).order_by("pk").values_list("pk", "cover_image")[:chunk])
+            if not rows:
+                break
+            last = rows[-1][0]
+            for (pk, source), variants in zip(rows, mapper(render, [source for _, source in rows])):
+                changed += model.objects.filter(pk=pk, cover_image=source).update(
+                    cover_variants=variants, updated_at=timezone.now(),
+                )
+        if changed:
+            invalidate(scope)
+        updated += changed
+    return updated
+
+
+def variant_urls(obj, request=None):
+    """{"thumb": {"webp": url, "jpeg": url}, "medium": {...}} for the current cover, or None."""
+    variants = obj.cover_variants or {}
+    if not obj.cover_image or variants.get("source") != obj.cover_image.name or "error" in variants:
+        return None
+    absolute = request.build_absolute_uri if request is not None else str
+    return {
+        variant: {ext: absolute(default_storage.url(name)) for ext, name in variants[variant].items()}
+        for variant in VARIANTS if variant in variants
+    }
@@ -0,0 +1,163 @@
+# library/db_router.py
+"""Read replica routing.
+
+`ReplicaMiddleware` lets GET/HEAD requests under REPLICA_READ_PREFIXES
+(catalog, events, analytics) read from the "replica" alias; everything
+else, every write and every migration goes to "default". The choice lives
+in a context variable, so it follows the request into sync_to_async
+threads and async views.
+
+Read-your-writes: after a POST/PUT/PATCH/DELETE the client's requests
+stick to the primary for REPLICA_STICKY_SECONDS, long enough for the
+replica to catch up. The marker travels with the client as a signed
+cookie, so every worker sees it. With a shared cache (SHARED_CACHE) it is
+also kept per user, taken from the JWT (signature only, no query) or the
+session, for API clients that do not send cookies back. Responses
+cached from a replica read are kept apart from those read from the
+primary (see library/caching.py), so a sticky client never gets a body
+cached from a replica that had not caught up yet. Without a "replica"
+entry in DATABASES the router does nothing.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import ClaimsJWTAuthentication
+
+REPLICA = "replica"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+STICKY_COOKIE = "db_primary"
+
+_read_db = ContextVar("read_db", default=None)
+
+
+@contextmanager
+def read_from(alias):
+    """Route reads of the enclosed code to `alias` (None: default)."""
+    token = _read_db.set(alias)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+def reading_replica():
+    """Whether reads of the current request go to the replica."""
+    return _read_db.get() == REPLICA and REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_db.get()
+        if alias and alias in settings.DATABASES:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплика — копия основной базы: связи между алиасами допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == "default"
+
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def _token_user_id(request):
+    auth = ClaimsJWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return auth.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def _has_session(request):
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def _replica_candidate(request):
+    return (
+        REPLICA in settings.DATABASES
+        and request.method in SAFE_METHODS
+        and request.path.startswith(tuple(settings.REPLICA_READ_PREFIXES))
+    )
+
+
+def _sticky_cookie(request):
+    return request.get_signed_cookie(
+        STICKY_COOKIE, default=None, salt=STICKY_COOKIE, max_age=settings.REPLICA_STICKY_SECONDS
+    ) is not None
+
+
+def _stick(response):
+    response.set_signed_cookie(
+        STICKY_COOKIE, "1", salt=STICKY_COOKIE, max_age=settings.REPLICA_STICKY_SECONDS,
+        secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax",
+    )
+
+
+class ReplicaMiddleware:
+    """Reads of safe catalog/events/analytics requests go to the replica unless the client just wrote."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = None
+        if settings.SHARED_CACHE:
+            user_id = _token_user_id(request)
+            if user_id is None and _has_session(request) and request.user.is_authenticated:
+                user_id = request.user.pk
+        alias = None
+        if _replica_candidate(request) and not (
+            _sticky_cookie(request) or (user_id and cache.get(_sticky_key(user_id)))
+        ):
+            alias = REPLICA
+        with read_from(alias):
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and REPLICA in settings.DATABASES:
+            _stick(response)
+            if user_id:
+                cache.set(_sticky_key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        user_id = None
+        if settings.SHARED_CACHE:
+            user_id = _token_user_id(request)
+            if user_id is None and _has_session(request):
+                user = await request.auser()
+                user_id = user.pk if user.is_authenticated else None
+        alias = None
+        if _replica_candidate(request) and not (
+            _sticky_cookie(request) or (user_id and await cache.aget(_sticky_key(user_id)))
+        ):
+            alias = REPLICA
+        with read_from(alias):
+            response = await self.get_response(request)
+        if request.method not in SAFE_METHODS and REPLICA in settings.DATABASES:
+            _stick(response)
+            if user_id:
+                await cache.aset(_sticky_key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+        return response
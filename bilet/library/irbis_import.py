@@ -0,0 +1,242 @@
+# library/irbis_import.py
+"""Map IRBIS (RDR) records onto the catalog and upsert them in batches.
+
+Records come from irbis.py: either live from the server or from an export
+(`records/` directory, JSONL or packed archive). Fields used:
+
+    10^a   ISBN                    606^a  subject heading -> Genre
+    200^a  title, ^e subtitle      700/701^a^b  author surname, initials
+    210^c  publisher, ^d year      910^a^b  copy status, inventory number
+    331    annotation
+
+Imports are incremental: ImportState remembers the highest MFN read by
+the last complete run, and the next one fetches only records after it.
+Records edited in IRBIS after they were imported come back with a full
+run, where unchanged records are still skipped by checksum.
+"""
+import hashlib
+import json
+import re
+
+from django.db import transaction
+
+from . import stats
+from .models import Author, BookCopy, BookGroup, Genre, ImportState, ids_for_names
+
+FIELD_RE = re.compile(r"^\s*(\d+)\s*[#:]\s?(.*)$")
+YEAR_RE = re.compile(r"\d{4}")
+
+# 910^a: 0 — на месте, 1 — выдан, 6 — списан/утерян
+COPY_STATUS_CODES = {"0": "available", "1": "issued", "6": "lost"}
+
+BOOK_FIELDS = ("title", "subtitle", "isbn", "publisher", "year", "description")
+STATE_NAME = "irbis"
+
+
+def last_imported_mfn():
+    """Highest MFN read by the last complete import (0 before the first one)."""
+    return ImportState.objects.filter(name=STATE_NAME).values_list("last_mfn", flat=True).first() or 0
+
+
+def remember_mfn(mfn):
+    """Move the import position forward to `mfn` (never back)."""
+    state, _ = ImportState.objects.get_or_create(name=STATE_NAME)
+    if mfn > state.last_mfn:
+        state.last_mfn = mfn
+        state.save(update_fields=["last_mfn", "updated_at"])
+
+
+def parse_fields(text):
+    """'200#^aTitle^eSub' / '200: ^aTitle' lines -> [(200, {'a': 'Title', 'e': 'Sub', '': ''}), ...]"""
+    fields = []
+    for line in text.replace("\x1f", "\n").splitlines():
+        m = FIELD_RE.match(line)
+        if not m:
+            continue
+        tag, value = int(m.group(1)), m.group(2).strip()
+        marker = "^" if "^" in value else ("$" if value.startswith("$") else None)
+        subfields = {}
+        if marker:
+            head, *parts = value.split(marker)
+            subfields[""] = head.strip()
+            for part in parts:
+                if part:
+                    subfields.setdefault(part[0].lower(), part[1:].strip())
+        else:
+            subfields[""] = value
+        fields.append((tag, subfields))
+    return fields
+
+
+def record_text(record):
+    """Text of an exported record; falls back to the raw record when there is no text."""
+    if record.get("text"):
+        return record["text"]
+    raw = record.get("raw")
+    if isinstance(raw, (bytes, bytearray)):
+        return raw.decode("utf-8", errors="replace")
+    return raw or ""
+
+
+def map_record(record):
+    """Exported IRBIS record -> dict for the catalog, or None if it has no title."""
+    fields = parse_fields(record_text(record))
+    first = {}
+    for tag, sub in fields:
+        first.setdefault(tag, sub)
+
+    title = first.get(200, {}).get("a") or first.get(200, {}).get("")
+    if not title:
+        return None
+
+    authors = []
+    for tag, sub in fields:
+        if tag in (700, 701) and sub.get("a"):
+            name = " ".join(p for p in (sub["a"], sub.get("b", "")) if p)
+            if name not in authors:
+                authors.append(name)
+    genres = []
+    for tag, sub in fields:
+        if tag == 606 and sub.get("a") and sub["a"] not in genres:
+            genres.append(sub["a"])
+    copies = []
+    for tag, sub in fields:
+        inventory = sub.get("b", "") if tag == 910 else ""
+        if inventory.isdigit():
+            copies.append((int(inventory), COPY_STATUS_CODES.get(sub.get("a", "0"), "available")))
+
+    year = YEAR_RE.search(first.get(210, {}).get("d", ""))
+    description = first.get(331, {})
+    mapped = {
+        "mfn": int(record["mfn"]),
+        "title": title,
+        "subtitle": first.get(200, {}).get("e") or None,
+        "isbn": first.get(10, {}).get("a") or None,
+        "publisher": first.get(210, {}).get("c") or None,
+        "year": int(year.group()) if year else None,
+        "description": description.get("a") or description.get("") or None,
+        "authors": authors,
+        "genres": genres,
+        "copies": copies,
+    }
+    mapped["checksum"] = hashlib.sha1(
+        json.dumps(mapped, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return mapped
+
+
+class NameCache:
+    """name -> id for Author/Genre, filled once and extended with bulk inserts."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = dict(model.objects.values_list("name", "id"))
+
+    def resolve(self, names):
+        missing = [n for n in names if n not in self.ids]
+        if missing:
+            self.ids.update(zip(dict.fromkeys(missing), ids_for_names(self.model, missing)))
+        return [self.ids[n] for n in names]
+
+
+class CatalogImporter:
+    """Upsert mapped records into BookGroup/Author/Genre/BookCopy, one transaction per batch."""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.authors = NameCache(Author)
+        self.genres = NameCache(Genre)
+        self.seen = 0
+        self.changed = 0
+        self.last_mfn = 0
+
+    def run(self, records):
+        batch = []
+        for record in records:
+            self.last_mfn = max(self.last_mfn, int(record["mfn"]))
+            mapped = map_record(record)
+            if mapped is None:
+                continue
+            self.seen += 1
+            batch.append(mapped)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.changed
+
+    def import_batch(self, batch):
+        # один MFN может встретиться в экспорте дважды (дозапись после сбоя) — берём последний
+        batch = list({m["mfn"]: m for m in batch}.values())
+        known = dict(
+            BookGroup.objects.filter(irbis_mfn__in=[m["mfn"] for m in batch])
+            .values_list("irbis_mfn", "irbis_checksum")
+        )
+        batch = [m for m in batch if known.get(m["mfn"]) != m["checksum"]]
+        if not batch:
+            return
+        with transaction.atomic():
+            self._claim_isbns(batch)
+            books = BookGroup.objects.bulk_create(
+                [
+                    BookGroup(irbis_mfn=m["mfn"], irbis_checksum=m["checksum"], **{f: m[f] for f in BOOK_FIELDS})
+                    for m in batch
+                ],
+                update_conflicts=True,
+                unique_fields=["irbis_mfn"],
+                update_fields=[*BOOK_FIELDS, "irbis_checksum", "updated_at"],
+            )
+            book_ids = {b.irbis_mfn: b.pk for b in books}
+            self._replace_m2m(BookGroup.authors.through, "author_id", self.authors, "authors", batch, book_ids)
+            self._replace_m2m(BookGroup.genres.through, "genre_id", self.genres, "genres", batch, book_ids)
+            BookCopy.objects.bulk_create(
+                [
+                    BookCopy(id=copy_id, book_group_id=book_ids[m["mfn"]], status=status)
+                    for m in batch for copy_id, status in m["copies"]
+                ],
+                ignore_conflicts=True,
+            )
+            BookGroup.objects.filter(pk__in=book_ids.values()).update_search_vector()
+            # bulk_create обходит сигналы — статистику новых и изменённых книг считаем сами
+            stats.refresh_books(book_ids.values())
+        self.changed += len(batch)
+
+    def _claim_isbns(self, batch):
+        """Attach books typed in by hand (same ISBN, no MFN yet) to their IRBIS record;
+        drop an ISBN already owned by another record so the unique index holds.
+
+        A record that already has its own row (imported earlier, when its
+        ISBN was missing or different) adopts nothing: it keeps that row and
+        leaves the ISBN to the hand-typed book.
+        """
+        owners = dict(
+            BookGroup.objects.filter(isbn__in=[m["isbn"] for m in batch if m["isbn"]])
+            .values_list("isbn", "irbis_mfn")
+        )
+        imported = set(
+            BookGroup.objects.filter(irbis_mfn__in=[m["mfn"] for m in batch]).values_list("irbis_mfn", flat=True)
+        )
+        adopt = {}
+        for m in batch:
+            isbn = m["isbn"]
+            if not isbn:
+                continue
+            if isbn not in owners:
+                owners[isbn] = m["mfn"]
+            elif owners[isbn] is None and m["mfn"] not in imported:
+                owners[isbn] = adopt[isbn] = m["mfn"]
+                imported.add(m["mfn"])
+            elif owners[isbn] != m["mfn"]:
+                m["isbn"] = None
+        for isbn, mfn in adopt.items():
+            BookGroup.objects.filter(isbn=isbn, irbis_mfn__isnull=True).update(irbis_mfn=mfn)
+
+    def _replace_m2m(self, through, column, cache, key, batch, book_ids):
+        ids = list(book_ids.values())
+        through.objects.filter(bookgroup_id__in=ids).delete()
+        rows = []
+        for m in batch:
+            for target_id in dict.fromkeys(cache.resolve(m[key])):
+                rows.append(through(bookgroup_id=book_ids[m["mfn"]], **{column: target_id}))
+        through.objects.bulk_create(rows, ignore_conflicts=True)
@@ -0,0 +1,134 @@
+import http.client
+import math
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from library.authentication import add_claims
+from library.models import User
+
+# Пары синхронный / async-вариант (library/async_views.py). Каталог и мероприятия с обеих
+# сторон отдаются из одного и того же кэша ответов, выдачи и /me не кэшируются нигде
+DEFAULT_PATHS = (
+    "/api/book-groups/",
+    "/api/async/book-groups/",
+    "/api/events/",
+    "/api/async/events/",
+    "/api/loans/active/",
+    "/api/async/loans/active/",
+    "/api/auth/me/",
+    "/api/async/auth/me/",
+)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+def _rss_kb(pid):
+    """Resident memory of `pid` and all its descendants (Linux /proc), in kB."""
+    total = 0
+    proc = Path(f"/proc/{pid}")
+    for line in (proc / "status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            total += int(line.split()[1])
+    for task in (proc / "task").iterdir():
+        children = (task / "children").read_text().split()
+        total += sum(_rss_kb(int(child)) for child in children)
+    return total
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server: requests/s and p50/p99 latency per path. "
+        "Run it once against the WSGI deployment (e.g. gunicorn bilet.wsgi -w 4) and "
+        "once against the ASGI one (e.g. uvicorn bilet.asgi:application --workers 4); "
+        "--pid reports the server's memory so both can be compared at equal RSS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+        parser.add_argument("--path", action="append", dest="paths", help="Path to load (repeatable; default: sync/async pairs)")
+        parser.add_argument("--concurrency", type=int, default=32, help="Parallel keep-alive connections")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per path")
+        parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per path")
+        parser.add_argument("--user", type=int, help="Authenticate as this user id (access token with claims)")
+        parser.add_argument("--token", help="Bearer access token to send instead of --user")
+        parser.add_argument("--pid", type=int, action="append", default=[], help="Server master pid(s) for RSS")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--url must be http://host[:port]")
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be positive")
+        headers = {"Accept": "application/json"}
+        token = options["token"]
+        if options["user"]:
+            user = User.objects.filter(pk=options["user"]).first()
+            if user is None:
+                raise CommandError(f"User {options['user']} not found")
+            token = str(add_claims(AccessToken.for_user(user), user))
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        target = (url.hostname, url.port or 80)
+        self.stdout.write(f"{'path':<32} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for path in options["paths"] or DEFAULT_PATHS:
+            path = url.path.rstrip("/") + path
+            self._load(target, path, headers, options["warmup"], options["concurrency"])
+            elapsed, latencies, errors = self._load(target, path, headers, options["requests"], options["concurrency"])
+            latencies.sort()
+            self.stdout.write(
+                f"{path:<32} {len(latencies) / elapsed:>8.1f} {_percentile(latencies, 50) * 1000:>8.1f} "
+                f"{_percentile(latencies, 99) * 1000:>8.1f} {errors:>7}"
+            )
+        if options["pid"]:
+            rss = sum(_rss_kb(pid) for pid in options["pid"])
+            self.stdout.write(f"server RSS: {rss / 1024:.0f} MB")
+
+    def _load(self, target, path, headers, total, concurrency):
+        """Send `total` GETs over `concurrency` connections; (seconds, latencies of 2xx/3xx, errors)."""
+        lock = threading.Lock()
+        remaining = [total]
+        latencies = []
+        errors = [0]
+
+        def worker():
+            conn = http.client.HTTPConnection(*target, timeout=30)
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection(*target, timeout=30)
+                    ok = False
+                took = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies.append(took)
+                    else:
+                        errors[0] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(min(concurrency, total))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, errors[0]
@@ -0,0 +1,32 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from library.covers import CHUNK, process_covers
+from library.jobs import run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Render thumbnail/medium WebP and JPEG variants of every book and event "
+        "cover that has none yet (or whose cover changed), in parallel processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Covers fetched per query")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be positive")
+        # воркеры работают только с файлами; соединения с БД им не передаём
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            mapper = lambda func, names: pool.map(func, names, chunksize=max(1, len(names) // (workers * 4)))
+            run = run_job("process_covers", process_covers, chunk=options["chunk"], mapper=mapper)
+        rate = run.rows * 1000 / run.duration_ms if run.duration_ms else 0
+        self.stdout.write(f"{run.rows} covers processed in {run.duration_ms} ms ({rate:.1f} covers/s, {workers} workers)")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.notifications import deliver, recount_unread
+
+
+class Command(BaseCommand):
+    help = "Fan queued notifications out of the outbox into readers' feeds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Outbox rows per transaction")
+        parser.add_argument(
+            "--interval", type=float, default=0,
+            help="Keep polling the outbox every N seconds instead of draining it once",
+        )
+        parser.add_argument("--recount", action="store_true", help="Rebuild unread counters first")
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.stdout.write(f"{recount_unread()} unread counters rebuilt")
+        interval = options["interval"]
+        while True:
+            started = time.monotonic()
+            created = deliver(batch_size=options["batch_size"])
+            if created or not interval:
+                elapsed = int((time.monotonic() - started) * 1000)
+                self.stdout.write(f"{created} notifications delivered in {elapsed} ms")
+            if not interval:
+                break
+            time.sleep(interval)
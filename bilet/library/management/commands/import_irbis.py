@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.irbis_import import CatalogImporter, last_imported_mfn, remember_mfn
+from library.jobs import timed_run
+
+
+def live_records(conn_string, start_mfn):
+    """Stream parsed records straight from the IRBIS server, one MFN at a time."""
+    import irbis
+
+    client = irbis.open_connection(conn_string)
+    try:
+        max_mfn = irbis.get_max_mfn(client) or 0
+        for mfn in range(start_mfn, max_mfn + 1):
+            ok, rec = irbis.safe_call(client.read_record, mfn)
+            if ok and rec:
+                yield {"mfn": mfn, "text": irbis.record_to_text(rec)}
+    finally:
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Import IRBIS records into BookGroup/Author/Genre/BookCopy. Only records after "
+        "the last MFN of the previous complete import are read; --full reads them all, "
+        "skipping records whose mapped fields did not change."
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--conn", help="IRBIS connection string (see irbis.py), e.g. 'host=...;database=RDR;...'")
+        source.add_argument("--source", help="irbis.py export: directory, records.jsonl[.gz|.zst] or records.pack")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--start-mfn", type=int, help="First MFN to read (default: after the last import)")
+        parser.add_argument("--full", action="store_true", help="Read every record, not only new MFNs")
+
+    def handle(self, *args, **options):
+        if options["start_mfn"] is not None:
+            after = options["start_mfn"] - 1
+        else:
+            after = 0 if options["full"] else last_imported_mfn()
+        if options["conn"]:
+            records = live_records(options["conn"], after + 1)
+        else:
+            import irbis
+
+            try:
+                records = irbis.RecordArchive(options["source"]).since(after)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        importer = CatalogImporter(batch_size=options["batch_size"])
+        with timed_run("import_irbis") as run:
+            run.rows = importer.run(records)
+        # позицию двигаем только после полного прохода: экспорт не обязательно упорядочен по MFN
+        remember_mfn(importer.last_mfn)
+        self.stdout.write(
+            f"{importer.seen} records read after MFN {after}, {importer.changed} imported or updated "
+            f"in {run.duration_ms} ms"
+        )
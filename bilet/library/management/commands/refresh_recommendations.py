@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from library.jobs import run_job
+from library.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = "Rescore BookSimilarity for books touched since the previous run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rescore every book")
+
+    def handle(self, *args, **options):
+        run = run_job("refresh_recommendations", refresh_recommendations, full=options["full"])
+        self.stdout.write(f"{run.rows} similarity rows written in {run.duration_ms} ms")
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.jobs import JOBS, start_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the background jobs of JOB_SCHEDULE at their intervals until stopped. "
+        "Start exactly one such process per deployment, next to the web workers."
+    )
+
+    def handle(self, *args, **options):
+        schedule = {name: interval for name, interval in settings.JOB_SCHEDULE.items() if interval}
+        unknown = set(schedule) - set(JOBS)
+        if unknown:
+            raise CommandError(f"Unknown jobs in JOB_SCHEDULE: {', '.join(sorted(unknown))}")
+        if not schedule:
+            raise CommandError("JOB_SCHEDULE is empty")
+
+        jobs = start_scheduler(schedule)
+        for name, interval in sorted(schedule.items()):
+            self.stdout.write(f"{name}: every {interval} s")
+        try:
+            while any(job.is_alive() for job in jobs.values()):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            for job in jobs.values():
+                job.stop()
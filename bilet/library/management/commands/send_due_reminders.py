@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.jobs import run_job
+from library.reminders import CHUNK, send_due_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Notify readers about loans due soon. Safe to re-run: every loan gets "
+        "at most one reminder per threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", help="Comma-separated thresholds in days (default: DUE_REMINDER_DAYS)")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Loans per transaction")
+
+    def handle(self, *args, **options):
+        thresholds = None
+        if options["days"]:
+            try:
+                thresholds = [int(d) for d in options["days"].split(",")]
+            except ValueError:
+                raise CommandError("--days expects integers, e.g. 3,1")
+            if any(d <= 0 for d in thresholds):
+                raise CommandError("--days must be positive")
+        run = run_job("send_due_reminders", send_due_reminders, thresholds=thresholds, chunk=options["chunk"])
+        rate = run.rows * 1000 / run.duration_ms if run.duration_ms else 0
+        self.stdout.write(f"{run.rows} loans reminded in {run.duration_ms} ms ({rate:.0f} loans/s)")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.jobs import run_job, sweep_overdue_loans
+
+
+class Command(BaseCommand):
+    help = "Mark every active loan past its due date as overdue (one set-based UPDATE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Repeat every N seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            run = run_job("sweep_overdue_loans", sweep_overdue_loans)
+            self.stdout.write(f"{run.rows} loans marked overdue in {run.duration_ms} ms")
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,155 @@
+# library/media_views.py
+"""Serving MEDIA_ROOT (covers and their variants).
+
+`serve_media` checks access and answers conditional requests itself, then
+leaves the bytes to the front proxy when MEDIA_SENDFILE is set:
+
+    location /protected-media/ {          # MEDIA_SENDFILE=nginx
+        internal;
+        alias /srv/bilet/media/;          # MEDIA_ROOT
+    }
+
+With MEDIA_SENDFILE=apache (mod_xsendfile) the full path goes into
+X-Sendfile. Without a proxy the file is sent with FileResponse (which the
+WSGI server can pass to sendfile()) and single byte ranges are honoured.
+
+Content-hashed variants (covers/v/) never change under the same name and
+are cached for a year as immutable; other files revalidate by ETag.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+
+from .covers import VARIANT_DIR
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=3600"
+PRIVATE = "private, no-cache"
+STAFF_ROLES = ("library", "admin")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _user(request):
+    if request.user.is_authenticated:
+        return request.user
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator().authenticate(request)
+        except APIException:
+            # просроченный или битый токен — просто аноним
+            continue
+        if result is not None:
+            return result[0]
+    return None
+
+
+def _allowed(request, name):
+    """Public prefixes (covers) are open to everyone, the rest only to library staff."""
+    if name.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES)):
+        return True
+    user = _user(request)
+    return user is not None and (user.is_staff or getattr(user, "role", None) in STAFF_ROLES)
+
+
+def _byte_range(header, size):
+    """(start, end) inclusive for a single "bytes=a-b" range, None to send everything, False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        # несколько диапазонов и прочие формы не поддерживаем: отдаём файл целиком (RFC 9110)
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read(full_path, start, length):
+    with open(full_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    # путь за пределами MEDIA_ROOT -> SuspiciousFileOperation (400)
+    full_path = safe_join(settings.MEDIA_ROOT, path)
+    name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    if not _allowed(request, name):
+        return HttpResponseForbidden()
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    public = name.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES))
+    cache_control = (IMMUTABLE if name.startswith(VARIANT_DIR) else REVALIDATE) if public else PRIVATE
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, full_path, name, stat.st_size, etag, last_modified)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def _file_response(request, full_path, name, size, etag, last_modified):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if content_type is None or encoding:
+        # .gz и подобное отдаём как есть, без Content-Encoding
+        content_type = "application/octet-stream"
+    if settings.MEDIA_SENDFILE == "nginx":
+        # Range и передачу файла берёт на себя nginx
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        return response
+    if settings.MEDIA_SENDFILE == "apache":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = quote(full_path)
+        return response
+
+    byte_range = None
+    header = request.headers.get("Range")
+    if header:
+        if_range = request.headers.get("If-Range")
+        if if_range is None or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+            byte_range = _byte_range(header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read(full_path, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    return response
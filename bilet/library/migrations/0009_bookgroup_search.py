@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Первичное заполнение search_vector; дальше его поддерживают сигналы library/signals.py
+BACKFILL_SQL = """
+UPDATE library_bookgroup bg SET search_vector =
+    setweight(to_tsvector('russian', coalesce(bg.title, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(bg.subtitle, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce((
+        SELECT string_agg(a.name, ' ')
+        FROM library_author a
+        JOIN library_bookgroup_authors ba ON ba.author_id = a.id
+        WHERE ba.bookgroup_id = bg.id
+    ), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(bg.description, '')), 'C');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_alter_event_cover_image'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='bookgroup',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bookgroup',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='bookgroup_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='bookgroup',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('title', name='gin_trgm_ops'), name='bookgroup_title_trgm'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
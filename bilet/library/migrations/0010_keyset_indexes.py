@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_bookgroup_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookgroup',
+            index=models.Index(fields=['created_at', 'id'], name='bookgroup_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['created_at', 'id'], name='event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['created_at', 'id'], name='loan_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='renewrequest',
+            index=models.Index(fields=['requested_at', 'id'], name='renewrequest_requested_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status__in', ('active', 'overdue'))), fields=['created_at', 'id'], name='loan_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='renewrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['requested_at', 'id'], name='renewrequest_pending_idx'),
+        ),
+    ]
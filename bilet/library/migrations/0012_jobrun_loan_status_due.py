@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_open_work_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_ms', models.IntegerField(default=0)),
+                ('rows', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'due_at'], name='loan_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobrun',
+            index=models.Index(fields=['name', '-started_at'], name='jobrun_name_started_idx'),
+        ),
+    ]
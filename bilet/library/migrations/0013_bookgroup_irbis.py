@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0012_jobrun_loan_status_due'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookgroup',
+            name='irbis_checksum',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookgroup',
+            name='irbis_mfn',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_bookgroup_irbis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('book_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_books', to='library.bookgroup')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='library.bookgroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['book_group', '-score'], name='booksimilarity_score_idx')],
+                'unique_together': {('book_group', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+INSERT INTO library_bookgroupstats (
+    book_group_id, total_issues, issues_30d, issues_90d,
+    copies_count, available_count, reviews_count, rating_sum, updated_at
+)
+SELECT bg.id,
+       COALESCE(l.total, 0), COALESCE(l.d30, 0), COALESCE(l.d90, 0),
+       COALESCE(c.total, 0), COALESCE(c.available, 0),
+       COALESCE(r.total, 0), COALESCE(r.rating_sum, 0),
+       now()
+FROM library_bookgroup bg
+LEFT JOIN (
+    SELECT c.book_group_id,
+           COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE l.issued_at >= now() - interval '30 days') AS d30,
+           COUNT(*) FILTER (WHERE l.issued_at >= now() - interval '90 days') AS d90
+    FROM library_loan l JOIN library_bookcopy c ON c.id = l.copy_id
+    GROUP BY c.book_group_id
+) l ON l.book_group_id = bg.id
+LEFT JOIN (
+    SELECT book_group_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE status = 'available') AS available
+    FROM library_bookcopy GROUP BY book_group_id
+) c ON c.book_group_id = bg.id
+LEFT JOIN (
+    SELECT book_group_id, COUNT(*) AS total, SUM(rating) AS rating_sum
+    FROM library_review GROUP BY book_group_id
+) r ON r.book_group_id = bg.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_booksimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookGroupStats',
+            fields=[
+                ('book_group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='library.bookgroup')),
+                ('total_issues', models.IntegerField(default=0)),
+                ('issues_30d', models.IntegerField(default=0)),
+                ('issues_90d', models.IntegerField(default=0)),
+                ('copies_count', models.IntegerField(default=0)),
+                ('available_count', models.IntegerField(default=0)),
+                ('reviews_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_issues'], name='bookgroupstats_total_idx'), models.Index(fields=['-issues_30d'], name='bookgroupstats_30d_idx'), models.Index(fields=['-issues_90d'], name='bookgroupstats_90d_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
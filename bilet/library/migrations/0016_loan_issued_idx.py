@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0015_bookgroupstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['issued_at'], include=('due_at', 'returned_at', 'reader'), name='loan_issued_idx'),
+        ),
+    ]
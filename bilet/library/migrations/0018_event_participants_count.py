@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0017_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='participants_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE library_event e
+            SET participants_count = (
+                SELECT COUNT(*) FROM library_event_participants p WHERE p.event_id = e.id
+            )
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.CreateModel(
+            name='EventWaitlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='library.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_waitlist', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'created_at', 'id'], name='eventwaitlist_queue_idx')],
+                'unique_together': {('event', 'user')},
+            },
+        ),
+    ]
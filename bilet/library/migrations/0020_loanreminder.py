@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0019_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('threshold', models.IntegerField()),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='library.loan')),
+            ],
+            options={
+                'unique_together': {('loan', 'threshold')},
+            },
+        ),
+    ]
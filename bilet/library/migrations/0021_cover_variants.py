@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0020_loanreminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookgroup',
+            name='cover_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='cover_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,6 +1,9 @@
 # library/models.py
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 
 ROLE_CHOICES = (
@@ -29,6 +32,9 @@ RENEW_STATUS = (
     ("rejected", "Rejected"),
 )
 
+# Конфигурация Postgres full-text для каталога (русская морфология, латиница как есть)
+SEARCH_CONFIG = "russian"
+
 
 class User(AbstractUser):
     # Наследуемся от AbstractUser, чтобы использовать username/password и админку.
@@ -73,6 +79,84 @@ class Genre(models.Model):
         return self.name
 
 
+def ids_for_names(model, names):
+    """Ids of `model` rows (Author/Genre) named `names`, in order, inserting the missing
+    ones with a single bulk_create. Costs at most three queries for any number of names."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    found = dict(model.objects.filter(name__in=names).values_list("name", "id"))
+    missing = [n for n in names if n not in found]
+    if missing:
+        model.objects.bulk_create([model(name=n) for n in missing], ignore_conflicts=True)
+        found.update(model.objects.filter(name__in=missing).values_list("name", "id"))
+    return [found[n] for n in names]
+
+
+class BookGroupQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Annotate counters from BookGroupStats so the serializer needs no per-row queries.
+
+        Books without a stats row get None and the serializer falls back to counting.
+        The search_vector column is only filtered on, never serialized, so it is
+        left out of the SELECT.
+        """
+        from django.db.models import F, FloatField
+        from django.db.models.functions import Cast, NullIf
+
+        return self.defer("search_vector").annotate(
+            copies_total=F("stats__copies_count"),
+            available_total=F("stats__available_count"),
+            reviews_total=F("stats__reviews_count"),
+            rating_avg=Cast("stats__rating_sum", FloatField()) / NullIf("stats__reviews_count", 0),
+        )
+
+    def update_search_vector(self):
+        """Recompute `search_vector` for every row of this queryset in one UPDATE.
+
+        Also moves `updated_at`: author names are part of what clients see,
+        so conditional GETs must notice them changing.
+        """
+        from django.contrib.postgres.aggregates import StringAgg
+        from django.contrib.postgres.search import SearchVector
+        from django.db.models import OuterRef, Subquery
+
+        author_names = (
+            Author.objects.filter(book_groups=OuterRef("pk"))
+            .order_by()
+            .values("book_groups")
+            .annotate(names=StringAgg("name", delimiter=" "))
+            .values("names")
+        )
+        return self.update(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("subtitle", weight="B", config=SEARCH_CONFIG)
+                + SearchVector(Subquery(author_names), weight="B", config=SEARCH_CONFIG)
+                + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def touch(self):
+        """Move `updated_at` of every row without saving the objects."""
+        return self.update(updated_at=timezone.now())
+
+    def search(self, text):
+        """Full-text match on `search_vector` or fuzzy match on title, best first."""
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+        from django.db.models import F, Q
+
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            self.filter(Q(search_vector=query) | Q(title__trigram_word_similar=text))
+            .annotate(
+                rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(text, "title"),
+            )
+            .order_by("-rank", "-id")
+        )
+
+
 class BookGroup(models.Model):
     title = models.TextField()
     subtitle = models.TextField(blank=True, null=True)
@@ -82,13 +166,32 @@ class BookGroup(models.Model):
     description = models.TextField(blank=True, null=True)
     cover_url = models.TextField(blank=True, null=True)
     cover_image = models.ImageField(upload_to="covers/", blank=True, null=True)
+    # Уменьшенные копии cover_image (library/covers.py): {"source": ..., "thumb": {"webp": ..., "jpeg": ...}, ...}
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False)
     age_limit = models.IntegerField(default=0)  # 0 — без ограничений
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Связь с записью IRBIS (manage.py import_irbis) и контрольная сумма её
+    # разобранных полей, чтобы повторный импорт пропускал неизменённые записи.
+    irbis_mfn = models.IntegerField(unique=True, blank=True, null=True)
+    irbis_checksum = models.CharField(max_length=40, blank=True, null=True)
+
     authors = models.ManyToManyField(Author, related_name="book_groups", blank=True)
     genres = models.ManyToManyField(Genre, related_name="book_groups", blank=True)
 
+    # title + subtitle + авторы + description; обновляется сигналами (library/signals.py)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    objects = BookGroupQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="bookgroup_search_gin"),
+            GinIndex(OpClass("title", name="gin_trgm_ops"), name="bookgroup_title_trgm"),
+            models.Index(fields=["created_at", "id"], name="bookgroup_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -124,23 +227,43 @@ class Loan(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="loan_created_idx"),
+            # Отчёты library/analytics.py: диапазон по issued_at без чтения таблицы
+            models.Index(fields=["issued_at"], include=["due_at", "returned_at", "reader"], name="loan_issued_idx"),
+            # Для пакетного перевода просроченных выдач в overdue (library/jobs.py)
+            models.Index(fields=["status", "due_at"], name="loan_status_due_idx"),
+            # Рабочий набор библиотекаря: невозвращённые выдачи
+            models.Index(
+                fields=["created_at", "id"], name="loan_open_created_idx",
+                condition=models.Q(status__in=("active", "overdue")),
+            ),
+        ]
+
     def is_overdue(self):
         if self.returned_at:
             return False
         return timezone.now() > self.due_at
 
     def save(self, *args, **kwargs):
-        # Автоматически обновляем статус по датам
+        # Возврат закрывает выдачу; active -> overdue переводит пакетная задача
+        # library.jobs.sweep_overdue_loans, а не каждое сохранение.
         if self.returned_at:
             self.status = "returned"
-        else:
-            if self.is_overdue():
-                self.status = "overdue"
-            else:
-                self.status = "active"
         super().save(*args, **kwargs)
 
 
+class LoanReminder(models.Model):
+    """A due-date reminder already sent for `loan` at `threshold` days; makes the job re-runnable."""
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="reminders")
+    threshold = models.IntegerField()
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("loan", "threshold")
+
+
 class RenewRequest(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="renew_requests")
     requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="renew_requests")
@@ -148,6 +271,15 @@ class RenewRequest(models.Model):
     new_due_at = models.DateTimeField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=RENEW_STATUS, default="pending")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["requested_at", "id"], name="renewrequest_requested_idx"),
+            models.Index(
+                fields=["requested_at", "id"], name="renewrequest_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
     def __str__(self):
         return f"RenewRequest {self.id} for loan {self.loan.id}"
 
@@ -160,20 +292,47 @@ class Event(models.Model):
     capacity = models.IntegerField(default=0)
     cover_url = models.TextField(blank=True, null=True)
     cover_image = models.ImageField(upload_to="covers/", blank=True, null=True)
+    # Уменьшенные копии cover_image (library/covers.py): {"source": ..., "thumb": {"webp": ..., "jpeg": ...}, ...}
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="created_events")
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
 
     participants = models.ManyToManyField(User, related_name="events", blank=True)
+    # Денормализованный счётчик участников: меняется условным UPDATE при записи
+    # (EventViewSet.register) и пересчитывается сигналом при правке participants напрямую.
+    participants_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="event_created_idx"),
+        ]
 
     def seats_left(self):
         if self.capacity <= 0:
             return None  # бесконечно
-        return max(0, self.capacity - self.participants.count())
+        return max(0, self.capacity - self.participants_count)
 
     def __str__(self):
         return self.title
 
 
+class EventWaitlist(models.Model):
+    """Queue of readers waiting for a seat; the oldest entry is seated when someone unregisters."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="waitlist")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="event_waitlist")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("event", "user")
+        indexes = [
+            models.Index(fields=["event", "created_at", "id"], name="eventwaitlist_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} waiting for {self.event}"
+
+
 class Review(models.Model):
     """User reviews for a BookGroup. One review per user per book.
 
@@ -188,6 +347,9 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ("book_group", "user")
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="review_created_idx"),
+        ]
 
     def __str__(self):
         return f"Review {self.id} by {self.user.username} for {self.book_group.title}"
@@ -200,5 +362,98 @@ class Notification(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="notification_user_idx"),
+        ]
+
     def __str__(self):
         return f"Notification for {self.user.username}: {self.title}"
+
+
+class NotificationOutbox(models.Model):
+    """A notification queued by the request path; library/notifications.py fans it out later."""
+    kind = models.CharField(max_length=50, blank=True, default="")
+    user_ids = ArrayField(models.BigIntegerField())
+    title = models.TextField()
+    message = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind or 'notification'} for {len(self.user_ids)} users"
+
+
+class NotificationCounter(models.Model):
+    """Unread notifications of a user, kept by delivery and mark-read instead of COUNT(*)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter")
+    unread = models.IntegerField(default=0)
+
+
+class JobRun(models.Model):
+    """One execution of a background job (see library/jobs.py)."""
+    name = models.CharField(max_length=100)
+    started_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.IntegerField(default=0)
+    rows = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name", "-started_at"], name="jobrun_name_started_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} at {self.started_at:%Y-%m-%d %H:%M}: {self.rows} rows"
+
+
+class ImportState(models.Model):
+    """How far an incremental import got, e.g. the last IRBIS MFN read (library/irbis_import.py)."""
+    name = models.CharField(max_length=100, unique=True)
+    last_mfn = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: up to MFN {self.last_mfn}"
+
+
+class BookSimilarity(models.Model):
+    """Precomputed "readers of this book also liked" pair, refreshed by
+    library.recommendations.refresh_recommendations."""
+    book_group = models.ForeignKey(BookGroup, on_delete=models.CASCADE, related_name="similar_books")
+    similar = models.ForeignKey(BookGroup, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("book_group", "similar")
+        indexes = [
+            models.Index(fields=["book_group", "-score"], name="booksimilarity_score_idx"),
+        ]
+
+
+class BookGroupStats(models.Model):
+    """Pre-aggregated counters of a BookGroup, maintained by library/stats.py.
+
+    Signals on Loan, BookCopy and Review keep the row current; issues_30d /
+    issues_90d only grow between runs of the reconciliation job
+    (manage.py rebuild_book_stats), which also lets them decay.
+    """
+    book_group = models.OneToOneField(BookGroup, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total_issues = models.IntegerField(default=0)
+    issues_30d = models.IntegerField(default=0)
+    issues_90d = models.IntegerField(default=0)
+    copies_count = models.IntegerField(default=0)
+    available_count = models.IntegerField(default=0)
+    reviews_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-total_issues"], name="bookgroupstats_total_idx"),
+            models.Index(fields=["-issues_30d"], name="bookgroupstats_30d_idx"),
+            models.Index(fields=["-issues_90d"], name="bookgroupstats_90d_idx"),
+        ]
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.reviews_count if self.reviews_count else 0
@@ -0,0 +1,100 @@
+# library/notifications.py
+"""Notification outbox.
+
+Request handlers and jobs call `notify`, which only inserts one
+NotificationOutbox row (inside the caller's transaction, so a rolled-back
+action notifies nobody). The `deliver_notifications` worker drains the
+outbox in batches: it fans every row out into Notification rows with
+bulk_create, bumps NotificationCounter and deletes the drained rows.
+Several workers can run at once; SKIP LOCKED gives each its own batch.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter, NotificationOutbox, User
+
+
+def notify(user_ids, title, message, kind=""):
+    """Queue `title`/`message` for every user in `user_ids`; one INSERT."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if user_ids:
+        NotificationOutbox.objects.create(kind=kind, user_ids=user_ids, title=title, message=message)
+
+
+def _add_unread(counts):
+    """counts: {user id: new notifications}; one UPDATE per distinct increment."""
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=uid) for uid in counts], ignore_conflicts=True
+    )
+    by_increment = defaultdict(list)
+    for uid, n in counts.items():
+        by_increment[n].append(uid)
+    for n, uids in by_increment.items():
+        NotificationCounter.objects.filter(user_id__in=uids).update(unread=F("unread") + n)
+
+
+def create_notifications(rows):
+    """bulk_create Notification rows and count them as unread; for background jobs only."""
+    Notification.objects.bulk_create(rows, batch_size=1000)
+    _add_unread(Counter(n.user_id for n in rows))
+
+
+def deliver_batch(batch_size=500):
+    """Deliver up to `batch_size` outbox rows; returns (rows drained, notifications created)."""
+    with transaction.atomic():
+        batch = list(NotificationOutbox.objects.select_for_update(skip_locked=True).order_by("id")[:batch_size])
+        if not batch:
+            return 0, 0
+        # читатель мог быть удалён, пока уведомление ждало в очереди
+        alive = set(User.objects.filter(pk__in={u for e in batch for u in e.user_ids}).values_list("pk", flat=True))
+        rows = [
+            Notification(user_id=uid, title=e.title, message=e.message, created_at=e.created_at)
+            for e in batch for uid in e.user_ids if uid in alive
+        ]
+        create_notifications(rows)
+        NotificationOutbox.objects.filter(pk__in=[e.pk for e in batch]).delete()
+    return len(batch), len(rows)
+
+
+def deliver(batch_size=500):
+    """Drain the outbox; returns the number of notifications created."""
+    total = 0
+    while True:
+        drained, created = deliver_batch(batch_size)
+        if not drained:
+            return total
+        total += created
+
+
+def unread_count(user):
+    return NotificationCounter.objects.filter(user=user).values_list("unread", flat=True).first() or 0
+
+
+def mark_read(user, ids=None):
+    """Mark `ids` (all if None) of `user`'s notifications read; returns how many changed."""
+    qs = Notification.objects.filter(user=user, read=False)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    with transaction.atomic():
+        changed = qs.update(read=True)
+        if changed:
+            NotificationCounter.objects.filter(user=user).update(unread=Greatest(F("unread") - changed, 0))
+    return changed
+
+
+def recount_unread():
+    """Rebuild every counter from the notifications table (after manual edits)."""
+    counts = dict(
+        Notification.objects.filter(read=False).order_by().values("user_id")
+        .annotate(n=Count("id")).values_list("user_id", "n")
+    )
+    with transaction.atomic():
+        NotificationCounter.objects.exclude(user_id__in=counts).update(unread=0)
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=uid, unread=n) for uid, n in counts.items()],
+            batch_size=1000, update_conflicts=True, unique_fields=["user"], update_fields=["unread"],
+        )
+    return len(counts)
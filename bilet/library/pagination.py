@@ -0,0 +1,234 @@
+# library/pagination.py
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Default paginator for list endpoints (see REST_FRAMEWORK in settings).
+
+    Every list is paged: {next, previous, results} with `page_size` rows;
+    a client that needs bigger pages may ask for up to `max_page_size`
+    with `?page_size=`, never for the whole table.
+
+    The cursor holds the last (or, going back, the first) row's values of
+    the view's `cursor_ordering` (``("-created_at", "-id")`` unless the view
+    says otherwise), and the next page is filtered on that whole tuple:
+    ``created_at < c OR (created_at = c AND id < i)``. With a matching
+    composite index page N costs the same as page 1, and rows sharing a
+    timestamp are neither skipped nor repeated. Every ordering field must
+    be present in the rows (for ``values()`` querysets too).
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        qs = self.keyset(queryset, request, getattr(view, "cursor_ordering", None))
+        return self.page(list(qs))
+
+    def keyset(self, queryset, request, ordering=None):
+        """`queryset` filtered past the request's cursor, ordered and sliced to one extra row.
+
+        Async views evaluate it themselves and hand the rows to `page`.
+        """
+        self.request = request
+        self.ordering = tuple([ordering] if isinstance(ordering, str) else ordering or self.ordering)
+        self.model = queryset.model
+        self.page_size = self._get_page_size(request)
+        self.reverse, values = self._decode(_params(request).get(self.cursor_query_param))
+        self.has_cursor = values is not None
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(_flip(f) for f in ordering)
+        if values is not None:
+            queryset = queryset.filter(_after(ordering, values))
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def page(self, rows):
+        """Rows of the current page from the evaluated `keyset` slice."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.rows = rows
+        return rows
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self._link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.rows:
+            return None
+        return self._link(self.rows[0], reverse=True)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param, "required": False, "in": "query",
+                "description": "Cursor from next/previous", "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param, "required": False, "in": "query",
+                "description": f"Rows per page (default {self.page_size}, at most {self.max_page_size})",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def _get_page_size(self, request):
+        try:
+            size = int(_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return type(self).page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _link(self, row, reverse):
+        payload = {"v": [_dump(_value(row, f.lstrip("-"))) for f in self.ordering]}
+        if reverse:
+            payload["r"] = 1
+        cursor = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def _decode(self, cursor):
+        """(reverse, ordering values) of `cursor`; (False, None) for the first page."""
+        if not cursor:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            raw = payload["v"]
+            if len(raw) != len(self.ordering):
+                raise ValueError
+            values = [self._field(f).to_python(v) for f, v in zip(self.ordering, raw)]
+        except (ValueError, TypeError, KeyError, DjangoValidationError, binascii.Error):
+            raise NotFound("Неверный курсор")
+        return bool(payload.get("r")), values
+
+    def _field(self, name):
+        return self.model._meta.get_field(name.lstrip("-"))
+
+
+def _params(request):
+    # DRF Request или обычный HttpRequest (async-представления)
+    return getattr(request, "query_params", request.GET)
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+def _value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def _dump(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _after(ordering, values):
+    """Rows strictly after `values` in `ordering`: lexicographic comparison of the whole tuple."""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+class SearchPagination(BasePagination):
+    """limit/offset for ranked search results without a COUNT(*) over all matches.
+
+    One extra row is fetched to know whether a next page exists.
+    """
+    default_limit = 20
+    max_limit = 100
+    limit_query_param = "limit"
+    offset_query_param = "offset"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self._get_int(request, self.limit_query_param, self.default_limit)
+        self.limit = max(1, min(self.limit, self.max_limit))
+        self.offset = max(0, self._get_int(request, self.offset_query_param, 0))
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        if self.offset - self.limit <= 0:
+            return remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.offset_query_param, self.offset - self.limit)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def _get_int(self, request, name, default):
+        try:
+            return int(request.query_params[name])
+        except (KeyError, ValueError):
+            return default
@@ -0,0 +1,168 @@
+# library/recommendations.py
+"""Item-item recommendations.
+
+`refresh_recommendations` (a background job, see library/jobs.py) scores
+pairs of books and keeps the best TOP_K neighbours of every book in
+BookSimilarity:
+
+    score = CO_BORROW_WEIGHT * co-readers / sqrt(readers(a) * readers(b))
+          + AUTHOR_WEIGHT * shared authors (at most 2)
+          + GENRE_WEIGHT * shared genres (at most 2)
+          + RATING_WEIGHT * average rating / 5
+
+Candidates come from co-borrowing and shared authors; genres and ratings
+only reorder them, so a large genre does not fan out to every book in it.
+Only books touched since the previous run are rescored. A request then
+reads the neighbours of the reader's recent books through the
+(book_group, -score) index.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+
+from .models import BookCopy, BookGroup, BookSimilarity, JobRun, Loan, Review
+
+CO_BORROW_WEIGHT = 1.0
+AUTHOR_WEIGHT = 0.3
+GENRE_WEIGHT = 0.1
+RATING_WEIGHT = 0.2
+TOP_K = 30
+CHUNK = 200
+HISTORY_SIZE = 50
+
+LOAN = Loan._meta.db_table
+COPY = BookCopy._meta.db_table
+BOOK_AUTHORS = BookGroup.authors.through._meta.db_table
+BOOK_GENRES = BookGroup.genres.through._meta.db_table
+
+CO_BORROW_SQL = f"""
+SELECT a.book_group_id, c2.book_group_id, COUNT(DISTINCT a.reader_id)
+FROM (
+    SELECT DISTINCT l.reader_id, c.book_group_id
+    FROM {LOAN} l JOIN {COPY} c ON c.id = l.copy_id
+    WHERE c.book_group_id = ANY(%s)
+) a
+JOIN {LOAN} l2 ON l2.reader_id = a.reader_id
+JOIN {COPY} c2 ON c2.id = l2.copy_id AND c2.book_group_id <> a.book_group_id
+GROUP BY 1, 2
+"""
+
+READERS_SQL = f"""
+SELECT c.book_group_id, COUNT(DISTINCT l.reader_id)
+FROM {LOAN} l JOIN {COPY} c ON c.id = l.copy_id
+WHERE c.book_group_id = ANY(%s)
+GROUP BY 1
+"""
+
+SHARED_SQL = """
+SELECT a.bookgroup_id, b.bookgroup_id, COUNT(*)
+FROM {table} a JOIN {table} b ON b.{column} = a.{column} AND b.bookgroup_id <> a.bookgroup_id
+WHERE a.bookgroup_id = ANY(%s) {extra}
+GROUP BY 1, 2
+"""
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _pairs(sql, params):
+    return {(a, b): n for a, b, n in _fetch(sql, params)}
+
+
+def score_books(book_ids):
+    """{book id: [(similar id, score), ...]} for `book_ids`, best TOP_K first."""
+    co = _pairs(CO_BORROW_SQL, [book_ids])
+    authors = _pairs(SHARED_SQL.format(table=BOOK_AUTHORS, column="author_id", extra=""), [book_ids])
+    candidates = set(co) | set(authors)
+    if not candidates:
+        return {}
+    genres = _pairs(
+        SHARED_SQL.format(table=BOOK_GENRES, column="genre_id", extra="AND b.bookgroup_id = ANY(%s)"),
+        [book_ids, list({b for _, b in candidates})],
+    )
+    involved = list({x for pair in candidates for x in pair})
+    readers = dict(_fetch(READERS_SQL, [involved])) if co else {}
+    ratings = dict(
+        Review.objects.filter(book_group_id__in=involved).values("book_group_id")
+        .annotate(avg=Avg("rating")).values_list("book_group_id", "avg")
+    )
+
+    scored = defaultdict(list)
+    for a, b in candidates:
+        score = 0.0
+        if (a, b) in co:
+            score += CO_BORROW_WEIGHT * co[(a, b)] / math.sqrt(readers[a] * readers[b])
+        score += AUTHOR_WEIGHT * min(authors.get((a, b), 0), 2)
+        score += GENRE_WEIGHT * min(genres.get((a, b), 0), 2)
+        score += RATING_WEIGHT * (ratings.get(b) or 0) / 5
+        scored[a].append((b, score))
+    return {a: sorted(pairs, key=lambda p: -p[1])[:TOP_K] for a, pairs in scored.items()}
+
+
+def dirty_books(since):
+    """Books whose neighbours may have changed since `since` (all books if None)."""
+    if since is None:
+        return list(BookGroup.objects.values_list("id", flat=True))
+    readers = Loan.objects.filter(created_at__gte=since).values("reader_id")
+    ids = set(
+        Loan.objects.filter(reader_id__in=readers).values_list("copy__book_group_id", flat=True).distinct()
+    )
+    ids.update(Review.objects.filter(created_at__gte=since).values_list("book_group_id", flat=True))
+    ids.update(BookGroup.objects.filter(updated_at__gte=since).values_list("id", flat=True))
+    return sorted(ids)
+
+
+def refresh_recommendations(full=False):
+    """Rescore books touched since the previous run; returns the number of rows written."""
+    since = None
+    if not full:
+        last = JobRun.objects.filter(name="refresh_recommendations").order_by("-started_at").first()
+        since = last.started_at if last else None
+    ids = dirty_books(since)
+    written = 0
+    for start in range(0, len(ids), CHUNK):
+        chunk = ids[start:start + CHUNK]
+        scored = score_books(chunk)
+        rows = [
+            BookSimilarity(book_group_id=a, similar_id=b, score=score)
+            for a, pairs in scored.items() for b, score in pairs
+        ]
+        with transaction.atomic():
+            BookSimilarity.objects.filter(book_group_id__in=chunk).delete()
+            BookSimilarity.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+    return written
+
+
+def recommended_book_ids(user, limit=20):
+    """Ids of books to suggest to `user`, best first."""
+    history = list(dict.fromkeys(
+        Loan.objects.filter(reader=user).order_by("-issued_at")
+        .values_list("copy__book_group_id", flat=True)[:HISTORY_SIZE * 3]
+    ))[:HISTORY_SIZE]
+    read = Loan.objects.filter(reader=user).values("copy__book_group_id")
+    ids = []
+    if history:
+        ids = list(
+            BookSimilarity.objects.filter(book_group_id__in=history)
+            .exclude(similar_id__in=read)
+            .values("similar_id").annotate(total=Sum("score")).order_by("-total")
+            .values_list("similar_id", flat=True)[:limit]
+        )
+    if len(ids) < limit:
+        # Новый читатель или мало соседей: добираем популярным за последние 90 дней
+        popular = (
+            Loan.objects.filter(created_at__gte=timezone.now() - timedelta(days=90))
+            .exclude(copy__book_group_id__in=read).exclude(copy__book_group_id__in=ids)
+            .values("copy__book_group_id").annotate(n=Count("id")).order_by("-n")
+            .values_list("copy__book_group_id", flat=True)[:limit - len(ids)]
+        )
+        ids += list(popular)
+    return ids
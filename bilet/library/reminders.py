@@ -0,0 +1,94 @@
+# library/reminders.py
+"""Due-date reminders.
+
+For every threshold (e.g. 3 and 1 days) the job walks active loans due
+within that window (the (status, due_at) index) in keyset chunks by
+reader; a chunk always ends with a reader's last loan, so each reader gets
+one notification per threshold. It records (loan, threshold) in
+LoanReminder with INSERT ... ON CONFLICT DO NOTHING and notifies only
+readers whose rows were actually inserted. A re-run, or two runs at once,
+therefore never sends the same reminder twice. Windows do not overlap:
+with thresholds (3, 1) a loan due in 2 days gets the 3-day reminder, one
+due in 12 hours only the 1-day one.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Loan, LoanReminder, Notification
+from .notifications import create_notifications
+
+CHUNK = 5000
+
+CLAIM_SQL = f"""
+INSERT INTO {LoanReminder._meta.db_table} (loan_id, threshold, sent_at)
+SELECT unnest(%s::bigint[]), %s, %s
+ON CONFLICT (loan_id, threshold) DO NOTHING
+RETURNING loan_id
+"""
+
+
+def _windows(thresholds):
+    """(3, 1) -> [(1, 0, 1), (3, 1, 3)]: threshold with the (from, to] window in days."""
+    days = sorted(set(thresholds))
+    return [(t, lower, t) for lower, t in zip([0] + days, days)]
+
+
+def _claim(loan_ids, threshold, now):
+    with connection.cursor() as cursor:
+        cursor.execute(CLAIM_SQL, [loan_ids, threshold, now])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _message(books):
+    books = sorted(books)
+    lines = [f"{title} — до {timezone.localtime(due):%d.%m.%Y}" for due, title in books]
+    return "Скоро срок возврата: " + "; ".join(lines)
+
+
+def send_due_reminders(thresholds=None, chunk=CHUNK, now=None):
+    """Remind readers of loans due within each threshold (days); returns loans reminded."""
+    thresholds = thresholds or settings.DUE_REMINDER_DAYS
+    now = now or timezone.now()
+    reminded = 0
+    for threshold, lower, upper in _windows(thresholds):
+        sent = LoanReminder.objects.filter(loan=OuterRef("pk"), threshold=threshold)
+        loans = (
+            Loan.objects.filter(
+                status="active",
+                due_at__gt=now + timedelta(days=lower),
+                due_at__lte=now + timedelta(days=upper),
+            )
+            .filter(~Exists(sent))
+            .order_by("reader_id", "due_at", "id")
+            .values_list("id", "due_at", "reader_id", "copy__book_group__title")
+        )
+        last_reader = None
+        while True:
+            page = loans if last_reader is None else loans.filter(reader_id__gt=last_reader)
+            rows = list(page[:chunk])
+            if not rows:
+                break
+            if len(rows) == chunk:
+                # дочитываем выдачи последнего читателя, иначе он получит два напоминания
+                loan_id, due_at, last_reader = rows[-1][:3]
+                rows += loans.filter(reader_id=last_reader).filter(
+                    Q(due_at__gt=due_at) | Q(due_at=due_at, id__gt=loan_id)
+                )
+            last_reader = rows[-1][2]
+            with transaction.atomic():
+                claimed = _claim([r[0] for r in rows], threshold, now)
+                books = defaultdict(list)
+                for loan_id, due_at, reader_id, title in rows:
+                    if loan_id in claimed:
+                        books[reader_id].append((due_at, title))
+                create_notifications([
+                    Notification(user_id=reader_id, title="Скоро срок возврата", message=_message(items), created_at=now)
+                    for reader_id, items in books.items()
+                ])
+            reminded += len(claimed)
+    return reminded
@@ -1,8 +1,10 @@
 # library/serializers.py
 from rest_framework import serializers
 from .models import (
-    User, Author, Genre, BookGroup, BookCopy, Loan, RenewRequest, Event, Notification, Review
+    User, Author, Genre, BookGroup, BookCopy, Loan, RenewRequest, Event, Notification, Review,
+    ids_for_names, COPY_STATUS,
 )
+from .covers import variant_urls
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 
@@ -32,6 +34,38 @@ class BookCopySerializer(serializers.ModelSerializer):
         return copy
 
 
+MAX_BULK_COPIES = 10000
+
+
+class BookCopyBulkSerializer(serializers.Serializer):
+    """One shipment line: copy ids for a book, as a list or an inclusive id range."""
+    book_group_id = serializers.IntegerField()
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False,
+                                max_length=MAX_BULK_COPIES)
+    id_from = serializers.IntegerField(min_value=1, required=False)
+    id_to = serializers.IntegerField(min_value=1, required=False)
+    status = serializers.ChoiceField(choices=COPY_STATUS, default="available")
+    condition = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, attrs):
+        has_range = "id_from" in attrs or "id_to" in attrs
+        if ("ids" in attrs) == has_range:
+            raise serializers.ValidationError("Укажите либо ids, либо диапазон id_from..id_to")
+        if has_range:
+            if "id_from" not in attrs or "id_to" not in attrs:
+                raise serializers.ValidationError("Диапазон требует id_from и id_to")
+            if attrs["id_to"] < attrs["id_from"]:
+                raise serializers.ValidationError({"id_to": "Должен быть не меньше id_from"})
+            if attrs["id_to"] - attrs["id_from"] + 1 > MAX_BULK_COPIES:
+                raise serializers.ValidationError(f"Не больше {MAX_BULK_COPIES} экземпляров за раз")
+        return attrs
+
+    def copy_ids(self, attrs):
+        if "ids" in attrs:
+            return attrs["ids"]
+        return range(attrs["id_from"], attrs["id_to"] + 1)
+
+
 class SimpleNameSerializer(serializers.Serializer):
     name = serializers.CharField()
 
@@ -44,42 +78,58 @@ class BookGroupSerializer(serializers.ModelSerializer):
     copies_count = serializers.SerializerMethodField()
     available_count = serializers.SerializerMethodField()
     cover_image = serializers.ImageField(required=False, allow_null=True, use_url=True)
+    cover_variants = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
 
     class Meta:
         model = BookGroup
         fields = ("id", "title", "subtitle", "isbn", "publisher", "year",
-            "description", "cover_url", "cover_image", "age_limit", "authors", "genres", "authors_full", "genres_full",
+            "description", "cover_url", "cover_image", "cover_variants", "age_limit", "authors", "genres", "authors_full", "genres_full",
             "created_at", "updated_at", "copies_count", "available_count", "average_rating", "reviews_count")
 
+    def get_cover_variants(self, obj):
+        return variant_urls(obj, self.context.get("request"))
+
+    # Счётчики берём из аннотаций BookGroup.objects.with_stats() (таблица BookGroupStats);
+    # запросы к БД остаются только для объектов без аннотаций или без строки статистики.
     def get_copies_count(self, obj):
-        return obj.copies.count()
+        count = getattr(obj, "copies_total", None)
+        if count is None:
+            return obj.copies.count()
+        return count
 
     def get_available_count(self, obj):
-        return obj.copies.filter(status="available").count()
+        count = getattr(obj, "available_total", None)
+        if count is None:
+            return obj.copies.filter(status="available").count()
+        return count
 
     def get_average_rating(self, obj):
-        # Use model helper
-        avg = obj.average_rating()
+        if getattr(obj, "reviews_total", None) is not None:
+            avg = obj.rating_avg
+        else:
+            # Use model helper
+            avg = obj.average_rating()
         if avg is None:
             return 0
         # round to 2 decimals
         return round(avg, 2)
 
     def get_reviews_count(self, obj):
-        return obj.reviews.count()
+        count = getattr(obj, "reviews_total", None)
+        if count is None:
+            return obj.reviews.count()
+        return count
 
     def create(self, validated_data):
         authors_data = validated_data.pop("authors", [])
         genres_data = validated_data.pop("genres", [])
         book = BookGroup.objects.create(**validated_data)
-        for a in authors_data:
-            author, _ = Author.objects.get_or_create(name=a["name"])
-            book.authors.add(author)
-        for g in genres_data:
-            genre, _ = Genre.objects.get_or_create(name=g["name"])
-            book.genres.add(genre)
+        if authors_data:
+            book.authors.add(*ids_for_names(Author, [a["name"] for a in authors_data]))
+        if genres_data:
+            book.genres.add(*ids_for_names(Genre, [g["name"] for g in genres_data]))
         return book
 
     def update(self, instance, validated_data):
@@ -88,16 +138,11 @@ class BookGroupSerializer(serializers.ModelSerializer):
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         instance.save()
+        # set() сравнивает с текущими связями и трогает только разницу
         if authors_data is not None:
-            instance.authors.clear()
-            for a in authors_data:
-                author, _ = Author.objects.get_or_create(name=a["name"])
-                instance.authors.add(author)
+            instance.authors.set(ids_for_names(Author, [a["name"] for a in authors_data]))
         if genres_data is not None:
-            instance.genres.clear()
-            for g in genres_data:
-                genre, _ = Genre.objects.get_or_create(name=g["name"])
-                instance.genres.add(genre)
+            instance.genres.set(ids_for_names(Genre, [g["name"] for g in genres_data]))
         return instance
 
 
@@ -105,6 +150,7 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "username", "email", "first_name", "last_name", "role", "phone", "birth_date", "password")
+        extra_kwargs = {"password": {"write_only": True}}
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -158,12 +204,59 @@ class LoanSerializer(serializers.ModelSerializer):
         copy.save()
         return loan
 
-class ActiveLoanSerializer(serializers.ModelSerializer):
-    loan_id = serializers.IntegerField()
-    copy_id = serializers.IntegerField()
-    book_title = serializers.CharField()
-    due_at = serializers.DateTimeField()
-    is_overdue = serializers.BooleanField()
+# Списки выдач и заявок: строки из одного values()-запроса вместо моделей и
+# вложенных сериализаторов. Форма та же, что у LoanSerializer, но только с тем,
+# что показывают страницы: экземпляр, название книги, читатель, даты.
+LOAN_ROW_FIELDS = (
+    "id", "status", "issued_at", "due_at", "returned_at", "renew_count",
+    "copy_id", "copy__book_group_id", "copy__book_group__title", "copy__condition",
+    "reader_id", "reader__username", "reader__first_name", "reader__last_name",
+)
+RENEW_ROW_FIELDS = (
+    "id", "status", "requested_by_id", "requested_at", "new_due_at",
+    *(f"loan__{f}" for f in LOAN_ROW_FIELDS),
+)
+
+
+def _loan_row(row, prefix=""):
+    f = lambda name: row[prefix + name]
+    return {
+        "id": f("id"),
+        "copy": {"id": f("copy_id"), "book_group": f("copy__book_group_id"), "condition": f("copy__condition")},
+        "book_title": f("copy__book_group__title"),
+        "reader": {
+            "id": f("reader_id"),
+            "username": f("reader__username"),
+            "first_name": f("reader__first_name"),
+            "last_name": f("reader__last_name"),
+        },
+        "issued_at": f("issued_at"),
+        "due_at": f("due_at"),
+        "returned_at": f("returned_at"),
+        "renew_count": f("renew_count"),
+        "status": f("status"),
+    }
+
+
+def loan_rows(rows):
+    """List representation of loans from `Loan.objects.values(*LOAN_ROW_FIELDS)`."""
+    return [_loan_row(row) for row in rows]
+
+
+def renew_request_rows(rows):
+    """List representation of renew requests from `RenewRequest.objects.values(*RENEW_ROW_FIELDS)`."""
+    return [
+        {
+            "id": row["id"],
+            "loan": _loan_row(row, "loan__"),
+            "requested_by": row["requested_by_id"],
+            "requested_at": row["requested_at"],
+            "new_due_at": row["new_due_at"],
+            "status": row["status"],
+        }
+        for row in rows
+    ]
+
 
 class RenewRequestSerializer(serializers.ModelSerializer):
     loan = LoanSerializer(read_only=True)
@@ -198,17 +291,24 @@ class ReviewSerializer(serializers.ModelSerializer):
         return Review.objects.create(book_group=bg, user=user, **validated_data)
 
 
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ("id", "title", "message", "created_at", "read")
+
+
 class EventSerializer(serializers.ModelSerializer):
-    participants_count = serializers.SerializerMethodField()
+    participants_count = serializers.IntegerField(read_only=True)
     seats_left = serializers.SerializerMethodField()
     cover_image = serializers.ImageField(required=False, allow_null=True, use_url=True)
+    cover_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
-        fields = ("id", "title", "description", "start_at", "duration_minutes", "capacity", "cover_url", "cover_image", "created_by", "participants_count", "seats_left")
-
-    def get_participants_count(self, obj):
-        return obj.participants.count()
+        fields = ("id", "title", "description", "start_at", "duration_minutes", "capacity", "cover_url", "cover_image", "cover_variants", "created_by", "participants_count", "seats_left")
 
     def get_seats_left(self, obj):
         return obj.seats_left()
+
+    def get_cover_variants(self, obj):
+        return variant_urls(obj, self.context.get("request"))
@@ -0,0 +1,195 @@
+# library/signals.py
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, stats
+from .authentication import forget_user
+from .models import Author, BookCopy, BookGroup, Event, Genre, Loan, Review, User
+
+
+# --- Поисковый индекс каталога (BookGroup.search_vector) ---
+
+@receiver(post_save, sender=BookGroup)
+def refresh_search_vector_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    BookGroup.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(m2m_changed, sender=BookGroup.authors.through)
+def refresh_search_vector_on_authors(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # book.authors.add/remove/clear: меняется одна книга
+        if action in ("post_add", "post_remove", "post_clear"):
+            BookGroup.objects.filter(pk=instance.pk).update_search_vector()
+        return
+
+    # author.book_groups.*: pk_set содержит id книг, для clear запоминаем их заранее
+    if action == "pre_clear":
+        instance._search_book_ids = list(instance.book_groups.values_list("pk", flat=True))
+    elif action == "post_clear":
+        ids = getattr(instance, "_search_book_ids", [])
+        BookGroup.objects.filter(pk__in=ids).update_search_vector()
+    elif action in ("post_add", "post_remove") and pk_set:
+        BookGroup.objects.filter(pk__in=pk_set).update_search_vector()
+
+
+@receiver(post_save, sender=Author)
+def refresh_search_vector_on_author_rename(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    BookGroup.objects.filter(authors=instance).update_search_vector()
+
+
+@receiver(pre_delete, sender=Author)
+def remember_author_books(sender, instance, **kwargs):
+    instance._search_book_ids = list(instance.book_groups.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def refresh_search_vector_on_author_delete(sender, instance, **kwargs):
+    ids = getattr(instance, "_search_book_ids", [])
+    BookGroup.objects.filter(pk__in=ids).update_search_vector()
+
+
+# --- updated_at для условных GET: жанры книги и участники мероприятия входят в ответ ---
+
+@receiver(m2m_changed, sender=BookGroup.genres.through)
+def touch_books_on_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            BookGroup.objects.filter(pk=instance.pk).touch()
+        return
+    if action == "pre_clear":
+        instance._touch_book_ids = list(instance.book_groups.values_list("pk", flat=True))
+    elif action == "post_clear":
+        BookGroup.objects.filter(pk__in=getattr(instance, "_touch_book_ids", [])).touch()
+    elif action in ("post_add", "post_remove") and pk_set:
+        BookGroup.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver(post_save, sender=Genre)
+def touch_books_on_genre_rename(sender, instance, created, raw=False, **kwargs):
+    if not (raw or created):
+        BookGroup.objects.filter(genres=instance).touch()
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_genre_books(sender, instance, **kwargs):
+    instance._touch_book_ids = list(instance.book_groups.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def touch_books_on_genre_delete(sender, instance, **kwargs):
+    BookGroup.objects.filter(pk__in=getattr(instance, "_touch_book_ids", [])).touch()
+
+
+def recount_participants(event_ids):
+    # правка participants в обход register/unregister (админка, скрипты): пересчитываем счётчик
+    count = (
+        Event.participants.through.objects.filter(event_id=OuterRef("pk"))
+        .order_by().values("event_id").annotate(n=Count("pk")).values("n")
+    )
+    Event.objects.filter(pk__in=event_ids).update(
+        participants_count=Coalesce(Subquery(count), 0), updated_at=timezone.now()
+    )
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+def recount_participants_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            recount_participants([instance.pk])
+        return
+    if action == "pre_clear":
+        instance._touch_event_ids = list(instance.events.values_list("pk", flat=True))
+    elif action == "post_clear":
+        recount_participants(getattr(instance, "_touch_event_ids", []))
+    elif action in ("post_add", "post_remove") and pk_set:
+        recount_participants(pk_set)
+
+
+# --- Статистика книг (BookGroupStats, см. library/stats.py) ---
+
+@receiver(post_save, sender=BookGroup)
+def create_book_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.create_rows([instance.pk])
+
+
+@receiver(post_save, sender=Loan)
+def count_issue(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.record_issue(instance.copy_id)
+
+
+@receiver(post_delete, sender=Loan)
+def recount_issues_on_loan_delete(sender, instance, **kwargs):
+    book_ids = BookCopy.objects.filter(pk=instance.copy_id).values_list("book_group_id", flat=True)
+    stats.recount(book_ids, stats.LOAN_FIELDS)
+
+
+@receiver(post_save, sender=BookCopy)
+def recount_copies_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.recount([instance.book_group_id], stats.COPY_FIELDS)
+
+
+@receiver(post_delete, sender=BookCopy)
+def recount_copies_on_delete(sender, instance, **kwargs):
+    # вместе с экземпляром каскадно удаляются и его выдачи
+    stats.recount([instance.book_group_id], stats.COPY_FIELDS + stats.LOAN_FIELDS)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def recount_reviews(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.recount([instance.book_group_id], stats.REVIEW_FIELDS)
+
+
+# --- Пользователь из claims JWT (library/authentication.py) ---
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+# --- Кеш ответов API (library/caching.py): версия области растёт после коммита ---
+
+CACHE_SCOPES = {
+    BookGroup: ("catalog", "stats"),
+    Author: ("catalog",),
+    Genre: ("catalog",),
+    BookCopy: ("catalog",),
+    Review: ("catalog", "reviews"),
+    Loan: ("stats",),
+    Event: ("events",),
+}
+
+M2M_CACHE_SCOPES = {
+    BookGroup.authors.through: ("catalog",),
+    BookGroup.genres.through: ("catalog",),
+    Event.participants.through: ("events",),
+}
+
+
+def invalidate_cached_responses(sender, raw=False, **kwargs):
+    if not raw:
+        caching.invalidate(*CACHE_SCOPES[sender])
+
+
+def invalidate_cached_responses_m2m(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        caching.invalidate(*M2M_CACHE_SCOPES[sender])
+
+
+for model in CACHE_SCOPES:
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f"cache-save-{model.__name__}")
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f"cache-delete-{model.__name__}")
+for through in M2M_CACHE_SCOPES:
+    m2m_changed.connect(invalidate_cached_responses_m2m, sender=through, dispatch_uid=f"cache-m2m-{through.__name__}")
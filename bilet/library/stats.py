@@ -0,0 +1,93 @@
+# library/stats.py
+"""Maintenance of BookGroupStats, the pre-aggregated counters of every book.
+
+Signals (library/signals.py) keep rows current as loans, copies and reviews
+change: a new loan bumps the issue counters with F() expressions, other
+changes recount the affected columns of one book. Bulk writers that bypass
+signals (copy intake, IRBIS import) call `refresh_books` themselves, which
+also invalidates the cached catalog responses.
+
+The 30/90-day windows only grow between runs of `rebuild` (the
+`rebuild_book_stats` command / job), which recounts everything from scratch
+and also fixes anything the signals could not see, such as a copy moved to
+another book.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import invalidate
+from .models import BookCopy, BookGroup, BookGroupStats, Loan, Review
+
+LOAN_FIELDS = ("total_issues", "issues_30d", "issues_90d")
+COPY_FIELDS = ("copies_count", "available_count")
+REVIEW_FIELDS = ("reviews_count", "rating_sum")
+ALL_FIELDS = LOAN_FIELDS + COPY_FIELDS + REVIEW_FIELDS
+
+
+def _per_book(qs, book_field, aggregate):
+    """Correlated subquery: `aggregate` over `qs` for the stats row's book, 0 if none."""
+    qs = qs.filter(**{book_field: OuterRef("book_group_id")}).order_by().values(book_field)
+    return Coalesce(Subquery(qs.annotate(v=aggregate).values("v"), output_field=IntegerField()), Value(0))
+
+
+def _issues(days=None):
+    loans = Loan.objects.all()
+    if days:
+        loans = loans.filter(issued_at__gte=timezone.now() - timedelta(days=days))
+    return _per_book(loans, "copy__book_group", Count("pk"))
+
+
+def _expressions():
+    return {
+        "total_issues": _issues(),
+        "issues_30d": _issues(30),
+        "issues_90d": _issues(90),
+        "copies_count": _per_book(BookCopy.objects.all(), "book_group", Count("pk")),
+        "available_count": _per_book(BookCopy.objects.filter(status="available"), "book_group", Count("pk")),
+        "reviews_count": _per_book(Review.objects.all(), "book_group", Count("pk")),
+        "rating_sum": _per_book(Review.objects.all(), "book_group", Sum("rating")),
+    }
+
+
+def recount(book_ids=None, fields=ALL_FIELDS):
+    """Recompute `fields` of existing rows for `book_ids` (all if None) with one UPDATE."""
+    qs = BookGroupStats.objects.all()
+    if book_ids is not None:
+        qs = qs.filter(pk__in=list(book_ids))
+    exprs = _expressions()
+    return qs.update(updated_at=timezone.now(), **{f: exprs[f] for f in fields})
+
+
+def create_rows(book_ids):
+    """Empty stats rows for `book_ids`; existing rows are left alone."""
+    BookGroupStats.objects.bulk_create(
+        [BookGroupStats(book_group_id=pk) for pk in book_ids], batch_size=1000, ignore_conflicts=True
+    )
+
+
+def refresh_books(book_ids, fields=ALL_FIELDS):
+    """Create missing rows for `book_ids` and recount them (used after bulk writes)."""
+    book_ids = list(book_ids)
+    create_rows(book_ids)
+    invalidate("catalog", "stats")
+    return recount(book_ids, fields)
+
+
+def record_issue(copy_id):
+    """Count a new loan of `copy_id` in place, without recounting the book."""
+    return BookGroupStats.objects.filter(book_group__copies=copy_id).update(
+        total_issues=F("total_issues") + 1,
+        issues_30d=F("issues_30d") + 1,
+        issues_90d=F("issues_90d") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild():
+    """Create rows for books that have none and recount every row from scratch."""
+    create_rows(BookGroup.objects.filter(stats__isnull=True).values_list("pk", flat=True).iterator())
+    invalidate("catalog", "stats")
+    return recount()
@@ -1,3 +1,229 @@
-from django.test import TestCase
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import irbis
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import BookCopy, BookGroup, Event, EventWaitlist, Loan, RenewRequest, User
+
+
+def race(calls):
+    """Run every `call()` in its own thread, released together; returns their results in order.
+
+    Each thread has its own database connection, as concurrent requests
+    would, and closes it when done.
+    """
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def worker(i, call):
+        try:
+            barrier.wait()
+            results[i] = call()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i, call)) for i, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def hammer(calls, workers=32):
+    """Run `calls` from a pool of `workers` threads, each request on a fresh connection; results in order."""
+    def run(call):
+        try:
+            return call()
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(run, calls))
+
+
+def make_user(n, role="reader"):
+    return User.objects.create(ticket_number=f"t{n}", contract_number=f"c{n}", role=role)
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class CirculationConcurrencyTests(TransactionTestCase):
+    """Parallel issue/return/approve on one copy or loan (see close_loan and BookCopyViewSet.issue)."""
+
+    THREADS = 8
+
+    def setUp(self):
+        self.librarian = make_user(0, role="library")
+        self.readers = [make_user(i + 1) for i in range(self.THREADS)]
+        self.copy = BookCopy.objects.create(id=1, book_group=BookGroup.objects.create(title="Война и мир"))
+
+    def post(self, url, data=None):
+        return lambda: client_for(self.librarian).post(url, data or {}, format="json").status_code
+
+    def issue_loan(self):
+        response = client_for(self.librarian).post(
+            f"/api/book-copies/{self.copy.pk}/issue/", {"reader_id": self.readers[0].pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return Loan.objects.get(pk=response.data["id"])
+
+    def test_parallel_issue_lends_copy_once(self):
+        url = f"/api/book-copies/{self.copy.pk}/issue/"
+        statuses = race([self.post(url, {"reader_id": reader.pk}) for reader in self.readers])
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), self.THREADS - 1, statuses)
+        self.assertEqual(Loan.objects.filter(copy=self.copy).count(), 1)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, "issued")
+
+    def test_parallel_returns_close_loan_once(self):
+        loan = self.issue_loan()
+        calls = [
+            self.post(f"/api/book-copies/{self.copy.pk}/return_copy/") if i % 2
+            else self.post(f"/api/loans/{loan.pk}/mark_returned/")
+            for i in range(self.THREADS)
+        ]
+        statuses = race(calls)
+
+        self.assertEqual(statuses.count(200), 1, statuses)
+        loan.refresh_from_db()
+        self.copy.refresh_from_db()
+        self.assertEqual(loan.status, "returned")
+        self.assertIsNotNone(loan.returned_at)
+        self.assertEqual(self.copy.status, "available")
+
+    def test_parallel_approvals_renew_once(self):
+        loan = self.issue_loan()
+        new_due_at = loan.due_at + timedelta(days=14)
+        renew = RenewRequest.objects.create(loan=loan, requested_by=self.readers[0], new_due_at=new_due_at)
+        statuses = race([self.post(f"/api/renew-requests/{renew.pk}/approve/") for _ in range(self.THREADS)])
+
+        self.assertEqual(statuses.count(200), 1, statuses)
+        self.assertEqual(statuses.count(400), self.THREADS - 1, statuses)
+        loan.refresh_from_db()
+        renew.refresh_from_db()
+        self.assertEqual(loan.renew_count, 1)
+        self.assertEqual(loan.due_at, new_due_at)
+        self.assertEqual(renew.status, "approved")
+
+    def test_issue_waits_for_copy_lock(self):
+        """While another transaction holds the copy row, issue blocks and then sees its outcome."""
+        issue = self.post(f"/api/book-copies/{self.copy.pk}/issue/", {"reader_id": self.readers[1].pk})
+        status = []
+
+        def worker():
+            try:
+                status.append(issue())
+            finally:
+                connection.close()
+
+        issuing = threading.Thread(target=worker)
+        with transaction.atomic():
+            BookCopy.objects.select_for_update().get(pk=self.copy.pk)
+            issuing.start()
+            issuing.join(timeout=1)
+            self.assertTrue(issuing.is_alive(), "issue did not wait for the row lock")
+            BookCopy.objects.filter(pk=self.copy.pk).update(status="issued", updated_at=timezone.now())
+        issuing.join()
+
+        self.assertEqual(status, [400])
+        self.assertFalse(Loan.objects.exists())
+
+
+class EventRegistrationLoadTests(TransactionTestCase):
+    """Hundreds of simultaneous registrations for one event (see join_event)."""
+
+    READERS = 300
+    CAPACITY = 100
+
+    def setUp(self):
+        self.readers = User.objects.bulk_create([
+            User(username=f"t{i}", ticket_number=f"t{i}", contract_number=f"c{i}") for i in range(self.READERS)
+        ])
+        self.event = Event.objects.create(title="Лекция", start_at=timezone.now() + timedelta(days=7), capacity=self.CAPACITY)
+
+    def register(self, user):
+        return lambda: client_for(user).post(f"/api/events/{self.event.pk}/register/").status_code
+
+    def test_no_overbooking_under_load(self):
+        statuses = hammer([self.register(user) for user in self.readers])
+
+        self.assertEqual(statuses.count(200), self.CAPACITY, statuses)
+        self.assertEqual(statuses.count(202), self.READERS - self.CAPACITY, statuses)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, self.CAPACITY)
+        self.assertEqual(self.event.participants.count(), self.CAPACITY)
+        self.assertEqual(EventWaitlist.objects.filter(event=self.event).count(), self.READERS - self.CAPACITY)
+        self.assertFalse(EventWaitlist.objects.filter(event=self.event, user__events=self.event).exists())
+
+    def test_repeated_registration_counts_once(self):
+        user = self.readers[0]
+        statuses = hammer([self.register(user) for _ in range(50)])
+
+        self.assertEqual(statuses.count(200), 1, statuses)
+        self.assertEqual(statuses.count(400), 49, statuses)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 1)
+        self.assertEqual(self.event.participants.count(), 1)
+
+
+class IrbisExportTests(SimpleTestCase):
+    """irbis.export_parallel against irbis_fake: parallel workers, crash and resume, packed index."""
+
+    RECORDS = 1000
+    DELETED = 97
+    CONN = f"fake:records={RECORDS};deleted={DELETED}"
+
+    def expected_mfns(self):
+        return [mfn for mfn in range(1, self.RECORDS + 1) if mfn % self.DELETED]
+
+    def export(self, out_dir, fmt):
+        irbis.export_parallel(self.CONN, out_dir, workers=4, chunk=50, quiet=True, fmt=fmt)
+
+    def crash_at(self, crash_mfn):
+        fetch = irbis.fetch_record
+
+        def fetch_or_crash(client, mfn):
+            if mfn == crash_mfn:
+                raise ConnectionError("connection reset")
+            return fetch(client, mfn)
+
+        return mock.patch.object(irbis, "fetch_record", fetch_or_crash)
+
+    def test_resumed_export_has_every_mfn_once(self):
+        for fmt, name in (("packed", "records.pack"), ("jsonl", "records.jsonl")):
+            with self.subTest(fmt=fmt), tempfile.TemporaryDirectory() as out_dir:
+                with self.crash_at(437), self.assertRaises(ConnectionError):
+                    self.export(out_dir, fmt)
+                with mock.patch.object(irbis, "fetch_record", wraps=irbis.fetch_record) as fetch:
+                    self.export(out_dir, fmt)
+                # возобновление перечитывает только незавершённые диапазоны
+                self.assertLess(fetch.call_count, self.RECORDS)
+
+                archive = irbis.RecordArchive(Path(out_dir) / name)
+                try:
+                    mfns = [record["mfn"] for record in archive]
+                    self.assertEqual(sorted(mfns), self.expected_mfns())
+                    self.assertEqual(len(mfns), len(set(mfns)))
+                    for mfn in (1, 437, 500, self.RECORDS):
+                        record = archive.get(mfn)
+                        self.assertEqual(record["mfn"], mfn)
+                        self.assertIn(f"Книга {mfn}", record["text"])
+                    self.assertIsNone(archive.get(self.DELETED))
+                    self.assertEqual([r["mfn"] for r in archive.since(990)], [m for m in self.expected_mfns() if m > 990])
+                finally:
+                    archive.close()
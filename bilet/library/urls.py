@@ -3,7 +3,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     BookGroupViewSet, BookCopyViewSet, LoanViewSet, RenewRequestViewSet,
-    EventViewSet, AnalyticsViewSet, UserActiveLoansView, UserReturnedLoansView, UserViewSet, ReviewViewSet
+    EventViewSet, AnalyticsViewSet, NotificationViewSet, UserActiveLoansView, UserReturnedLoansView, UserViewSet, ReviewViewSet
 )
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -12,6 +12,7 @@ from rest_framework_simplejwt.views import (
 )
 from library.auth_views import AdminLoginView, MeView, ReaderLoginView, LibraryLoginView
 from library.auth_views import InspectTokenView
+from library import async_views
 
 router = DefaultRouter()
 router.register(r"book-groups", BookGroupViewSet, basename="bookgroup")
@@ -21,6 +22,8 @@ router.register(r"renew-requests", RenewRequestViewSet, basename="renewrequest")
 router.register(r"events", EventViewSet, basename="event")
 router.register(r"reviews", ReviewViewSet, basename="review")
 router.register(r"users", UserViewSet, basename="user")
+router.register(r"analytics", AnalyticsViewSet, basename="analytics")
+router.register(r"notifications", NotificationViewSet, basename="notification")
 
 urlpatterns = [
     path("api/auth/reader/login/", ReaderLoginView.as_view()),
@@ -31,5 +34,12 @@ urlpatterns = [
     path("api/loans/active/", UserActiveLoansView.as_view()),
     path("api/loans/returned/", UserReturnedLoansView.as_view()),
     path("api/auth/me/", MeView.as_view()),
+    # Async-варианты горячих чтений для ASGI (library/async_views.py)
+    path("api/async/book-groups/", async_views.book_groups),
+    path("api/async/book-groups/search/", async_views.book_group_search),
+    path("api/async/book-groups/<int:pk>/", async_views.book_group),
+    path("api/async/events/", async_views.events),
+    path("api/async/loans/active/", async_views.active_loans),
+    path("api/async/auth/me/", async_views.me),
     path("api/", include(router.urls)),
 ]
@@ -1,18 +1,33 @@
 # library/views.py
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db import transaction
-from .models import User, Author, Genre, BookGroup, BookCopy, Loan, RenewRequest, Event, Notification, Review
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max, Q
+from .models import (
+    User, Author, Genre, BookGroup, BookGroupStats, BookCopy, Loan, RenewRequest, Event, EventWaitlist,
+    Notification, Review,
+    LOAN_STATUS, RENEW_STATUS,
+)
+from . import analytics, stats
+from .caching import cache_response, conditional, invalidate
+from .notifications import mark_read, notify, unread_count
+from .pagination import SearchPagination
+from .recommendations import recommended_book_ids
 from .serializers import (
     UserCreateSerializer, UserSerializer, AuthorSerializer, GenreSerializer, BookGroupSerializer,
-    BookCopySerializer, LoanSerializer, RenewRequestSerializer, EventSerializer, ReviewSerializer
+    BookCopySerializer, BookCopyBulkSerializer, MAX_BULK_COPIES, LoanSerializer, RenewRequestSerializer, EventSerializer, ReviewSerializer,
+    NotificationSerializer, LOAN_ROW_FIELDS, RENEW_ROW_FIELDS, loan_rows, renew_request_rows,
 )
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.exceptions import ValidationError, PermissionDenied
-from datetime import timedelta
+from rest_framework.generics import get_object_or_404
+from datetime import datetime, time, timedelta
 
 # Простая роль-пермишен проверка (можно заменить на более серьёзную систему)
 def require_role(user, role_or_roles):
@@ -30,9 +45,67 @@ def require_role(user, role_or_roles):
             raise PermissionDenied(detail=f"Требуется роль {role_or_roles}")
 
 
+def int_param(request, name):
+    """Return query param `name` as int, None if absent; ValidationError if malformed."""
+    value = request.query_params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Ожидается целое число"})
+
+
+def datetime_param(request, name):
+    """Return query param `name` (ISO date or datetime) as an aware datetime, None if absent."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            dt = datetime.combine(d, time.min) if d else None
+    except ValueError:
+        dt = None
+    if dt is None:
+        raise ValidationError({name: "Ожидается дата или дата-время в формате ISO 8601"})
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def filter_by_params(qs, request, lookups, statuses=(), due_field=None):
+    """Apply the common list filters.
+
+    `lookups` maps integer query params to ORM lookups. `status` accepts a
+    comma-separated list; `due_after`/`due_before` bound `due_field`.
+    """
+    status_param = request.query_params.get("status")
+    if status_param:
+        values = [v for v in status_param.split(",") if v]
+        unknown = set(values) - set(statuses)
+        if unknown:
+            raise ValidationError({"status": f"Неизвестный статус: {', '.join(sorted(unknown))}"})
+        qs = qs.filter(status__in=values)
+    for param, lookup in lookups.items():
+        value = int_param(request, param)
+        if value is not None:
+            qs = qs.filter(**{lookup: value})
+    if due_field:
+        due_after = datetime_param(request, "due_after")
+        if due_after:
+            qs = qs.filter(**{f"{due_field}__gte": due_after})
+        due_before = datetime_param(request, "due_before")
+        if due_before:
+            qs = qs.filter(**{f"{due_field}__lt": due_before})
+    return qs
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("-id",)
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -84,11 +157,81 @@ class UserViewSet(viewsets.ModelViewSet):
         user = serializer.save()
         return Response(UserSerializer(user).data, status=201)
 
+def _latest(*values):
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def book_groups_validators(view, request, *args, **kwargs):
+    """List: row count + newest book/stats change; stats rows move with copies, loans and reviews."""
+    agg = BookGroup.objects.aggregate(n=Count("id"), book=Max("updated_at"), stats=Max("stats__updated_at"))
+    modified = _latest(agg["book"], agg["stats"])
+    return f"{agg['n']}-{modified.timestamp() if modified else 0}", modified
+
+
+def book_group_validators(view, request, pk=None, **kwargs):
+    row = BookGroup.objects.filter(pk=pk).values_list("updated_at", "stats__updated_at").first() if pk else None
+    if row is None:
+        return None, None
+    modified = _latest(*row)
+    return f"{pk}-{modified.timestamp()}", modified
+
+
+def events_validators(view, request, *args, **kwargs):
+    agg = Event.objects.aggregate(n=Count("id"), modified=Max("updated_at"))
+    modified = agg["modified"]
+    return f"{agg['n']}-{modified.timestamp() if modified else 0}", modified
+
+
+def event_validators(view, request, pk=None, **kwargs):
+    modified = Event.objects.filter(pk=pk).values_list("updated_at", flat=True).first() if pk else None
+    if modified is None:
+        return None, None
+    return f"{pk}-{modified.timestamp()}", modified
+
+
 class BookGroupViewSet(viewsets.ModelViewSet):
-    queryset = BookGroup.objects.prefetch_related("authors", "genres", "copies").all()
+    queryset = BookGroup.objects.with_stats().prefetch_related("authors", "genres")
     serializer_class = BookGroupSerializer
     permission_classes = [IsAuthenticated]
 
+    @cache_response(ttl=300, scopes=("catalog",))
+    @conditional(book_groups_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(ttl=300, scopes=("catalog",))
+    @conditional(book_group_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"], pagination_class=SearchPagination)
+    def search(self, request):
+        """Ranked catalog search: GET /api/book-groups/search/?q=...&limit=20&offset=0
+
+        Matches title/subtitle/description/author names through the full-text
+        index and misspelled title words through the trigram index.
+        """
+        q = request.query_params.get("q", "").strip()
+        if not q:
+            raise ValidationError({"q": "required"})
+        qs = self.get_queryset().search(q)
+        page = self.paginate_queryset(qs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def recommended(self, request):
+        """Books for the current reader from the precomputed similarity table.
+
+        GET /api/book-groups/recommended/?limit=20 (at most 50)
+        """
+        limit = min(max(int_param(request, "limit") or 20, 1), 50)
+        ids = recommended_book_ids(request.user, limit)
+        books = {b.id: b for b in self.get_queryset().filter(id__in=ids)}
+        serializer = self.get_serializer([books[i] for i in ids if i in books], many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=["get"])
     def copies(self, request, pk=None):
         bg = self.get_object()
@@ -96,6 +239,7 @@ class BookGroupViewSet(viewsets.ModelViewSet):
         return Response(BookCopySerializer(copies, many=True).data)
 
     @action(detail=True, methods=["get"])
+    @cache_response(ttl=120, scopes=("reviews",))
     def reviews(self, request, pk=None):
         """Return reviews for this BookGroup."""
         bg = self.get_object()
@@ -109,33 +253,122 @@ class BookGroupViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+def close_loan(copy_pk, loans, condition=None):
+    """Close the open loan of copy `copy_pk` among `loans` and make the copy available.
+
+    Locks the copy row first and the loan second, in the same order as
+    issue, so concurrent return/mark_returned calls close a loan only once.
+    Returns the closed loan, or None if there was nothing open.
+    """
+    with transaction.atomic():
+        copy = BookCopy.objects.select_for_update().get(pk=copy_pk)
+        loan = (
+            loans.select_for_update().filter(copy_id=copy_pk, status__in=("active", "overdue"))
+            .order_by("-issued_at").first()
+        )
+        if loan is None:
+            return None
+        loan.returned_at = timezone.now()
+        if condition is not None:
+            loan.return_condition = condition
+        loan.save()
+        copy.status = "available"
+        copy.save()
+    return loan
+
+
 class BookCopyViewSet(viewsets.ModelViewSet):
     queryset = BookCopy.objects.select_related("book_group").all()
     serializer_class = BookCopySerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("id",)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Приём партии экземпляров: POST /api/book-copies/bulk/
+
+        Body: {"book_group_id": 1, "ids": [101, 102]} or {"book_group_id": 1,
+        "id_from": 100, "id_to": 599}, or a list of such objects. Ids that are
+        taken or repeated are reported in `conflicts`; the rest are inserted in
+        one transaction.
+        """
+        require_role(request.user, ("library", "admin"))
+        many = isinstance(request.data, list)
+        serializer = BookCopyBulkSerializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data if many else [serializer.validated_data]
+        line = BookCopyBulkSerializer()
+        if sum(len(line.copy_ids(i)) for i in items) > MAX_BULK_COPIES:
+            raise ValidationError(f"Не больше {MAX_BULK_COPIES} экземпляров за раз")
+
+        known_groups = set(
+            BookGroup.objects.filter(id__in={i["book_group_id"] for i in items}).values_list("id", flat=True)
+        )
+        # Одна выборка занятых id: диапазоны через BETWEEN, списки через IN
+        lookup = Q(pk__in=[])
+        for item in items:
+            if "ids" in item:
+                lookup |= Q(pk__in=item["ids"])
+            else:
+                lookup |= Q(pk__range=(item["id_from"], item["id_to"]))
+        taken = set(BookCopy.objects.filter(lookup).values_list("id", flat=True))
+
+        now = timezone.now()
+        copies, conflicts, seen = [], [], set()
+        for item in items:
+            group_id = item["book_group_id"]
+            for copy_id in line.copy_ids(item):
+                if group_id not in known_groups:
+                    detail = "Книга не найдена"
+                elif copy_id in taken:
+                    detail = "Экземпляр с таким id уже существует"
+                elif copy_id in seen:
+                    detail = "id повторяется в запросе"
+                else:
+                    seen.add(copy_id)
+                    copies.append(BookCopy(
+                        id=copy_id, book_group_id=group_id, status=item["status"],
+                        condition=item.get("condition"), created_at=now,
+                    ))
+                    continue
+                conflicts.append({"id": copy_id, "book_group_id": group_id, "detail": detail})
+
+        try:
+            with transaction.atomic():
+                BookCopy.objects.bulk_create(copies, batch_size=1000)
+                stats.refresh_books({c.book_group_id for c in copies}, stats.COPY_FIELDS)
+        except IntegrityError:
+            # кто-то занял те же id между проверкой и вставкой
+            return Response({"detail": "Конфликт при вставке, повторите запрос"}, status=409)
+        return Response(
+            {"created": len(copies), "conflicts": conflicts},
+            status=201 if copies else 409,
+        )
 
     @action(detail=True, methods=["post"])
     def issue(self, request, pk=None):
         # Выдача экземпляра copy -> loan
-        copy = self.get_object()
         reader_id = request.data.get("reader_id")
         if not reader_id:
             raise ValidationError({"reader_id": "required"})
         reader = User.objects.get(id=reader_id)
+        due_days = int(request.data.get("due_days", 21))  # по умолчанию 21 день
 
-        # Проверка на возраст
-        if copy.book_group.age_limit and reader.birth_date:
-            age = (timezone.now().date() - reader.birth_date).days // 365
-            if age < copy.book_group.age_limit:
-                return Response({"detail": "Возрастной рейтинг запрещает выдачу"}, status=400)
+        # Строка экземпляра блокируется до конца транзакции: параллельная выдача
+        # того же экземпляра ждёт и затем видит status="issued".
+        with transaction.atomic():
+            copy = get_object_or_404(self.get_queryset().select_for_update(of=("self",)), pk=pk)
 
-        if copy.status != "available":
-            return Response({"detail": "Копия недоступна для выдачи"}, status=400)
+            # Проверка на возраст
+            if copy.book_group.age_limit and reader.birth_date:
+                age = (timezone.now().date() - reader.birth_date).days // 365
+                if age < copy.book_group.age_limit:
+                    return Response({"detail": "Возрастной рейтинг запрещает выдачу"}, status=400)
 
-        due_days = int(request.data.get("due_days", 21))  # по умолчанию 21 день
-        due_at = timezone.now() + timedelta(days=due_days)
+            if copy.status != "available":
+                return Response({"detail": "Копия недоступна для выдачи"}, status=400)
 
-        with transaction.atomic():
+            due_at = timezone.now() + timedelta(days=due_days)
             loan = Loan.objects.create(copy=copy, reader=reader, issued_by=request.user if request.user.is_authenticated else None, due_at=due_at)
             copy.status = "issued"
             copy.save()
@@ -144,15 +377,9 @@ class BookCopyViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def return_copy(self, request, pk=None):
         copy = self.get_object()
-        try:
-            loan = Loan.objects.filter(copy=copy, status="active").latest("issued_at")
-        except Loan.DoesNotExist:
+        loan = close_loan(copy.pk, Loan.objects.all(), request.data.get("condition", ""))
+        if loan is None:
             return Response({"detail": "Активная выдача не найдена"}, status=404)
-        loan.returned_at = timezone.now()
-        loan.return_condition = request.data.get("condition", "")
-        loan.save()
-        copy.status = "available"
-        copy.save()
         return Response({"detail": "Принято"}, status=200)
 
 
@@ -161,6 +388,22 @@ class LoanViewSet(viewsets.ModelViewSet):
     serializer_class = LoanSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        """Filters: ?status=active,overdue&reader=&copy=&book_group=&due_after=&due_before="""
+        return filter_by_params(
+            super().get_queryset(), self.request,
+            {"reader": "reader_id", "copy": "copy_id", "book_group": "copy__book_group_id"},
+            statuses=dict(LOAN_STATUS), due_field="due_at",
+        )
+
+    def list(self, request, *args, **kwargs):
+        # created_at нужен курсору пагинации, в ответ не попадает
+        qs = self.filter_queryset(self.get_queryset()).values(*LOAN_ROW_FIELDS, "created_at")
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return self.get_paginated_response(loan_rows(page))
+        return Response(loan_rows(qs))
+
     @action(detail=True, methods=["post"])
     def extend(self, request, pk=None):
         loan = self.get_object()
@@ -178,12 +421,8 @@ class LoanViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def mark_returned(self, request, pk=None):
         loan = self.get_object()
-        if loan.returned_at:
+        if close_loan(loan.copy_id, Loan.objects.filter(pk=loan.pk)) is None:
             return Response({"detail": "Уже возвращено"}, status=400)
-        loan.returned_at = timezone.now()
-        loan.save()
-        loan.copy.status = "available"
-        loan.copy.save()
         return Response({"detail": "Отмечено как возвращенное"}, status=200)
 
 class UserActiveLoansView(APIView):
@@ -194,12 +433,10 @@ class UserActiveLoansView(APIView):
 
         loans = (
             Loan.objects
-            .filter(reader=user, status="active")
-            .select_related("copy", "copy__book_group")
+            .filter(reader=user, status__in=("active", "overdue"))
+            .values(*LOAN_ROW_FIELDS)
         )
-
-        data = LoanSerializer(loans, many=True).data
-        return Response(data)
+        return Response(loan_rows(loans))
     
 class UserReturnedLoansView(APIView):
     permission_classes = [IsAuthenticated]
@@ -210,63 +447,207 @@ class UserReturnedLoansView(APIView):
         loans = (
             Loan.objects
             .filter(reader=user, status="returned")
-            .select_related("copy", "copy__book_group")
+            .values(*LOAN_ROW_FIELDS)
         )
-
-        data = LoanSerializer(loans, many=True).data
-        return Response(data)
+        return Response(loan_rows(loans))
 
 class RenewRequestViewSet(viewsets.ModelViewSet):
     queryset = RenewRequest.objects.select_related("loan", "requested_by").all()
     serializer_class = RenewRequestSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ("-requested_at", "-id")
+
+    def get_queryset(self):
+        """Filters: ?status=pending&reader=&copy=&loan=&book_group=&due_after=&due_before=
+
+        `due_*` bound the requested new due date.
+        """
+        return filter_by_params(
+            super().get_queryset(), self.request,
+            {
+                "loan": "loan_id",
+                "reader": "loan__reader_id",
+                "copy": "loan__copy_id",
+                "book_group": "loan__copy__book_group_id",
+            },
+            statuses=dict(RENEW_STATUS), due_field="new_due_at",
+        )
+
+    def list(self, request, *args, **kwargs):
+        qs = self.filter_queryset(self.get_queryset()).values(*RENEW_ROW_FIELDS)
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            return self.get_paginated_response(renew_request_rows(page))
+        return Response(renew_request_rows(qs))
 
     @action(detail=True, methods=["post"])
     def approve(self, request, pk=None):
         require_role(request.user, ("library", "admin"))
-        rr = self.get_object()
-        if rr.status != "pending":
-            return Response({"detail": "Старая заявка"}, status=400)
-        loan = rr.loan
-        loan.due_at = rr.new_due_at or (loan.due_at + timedelta(days=14))
-        loan.renew_count += 1
-        loan.save()
-        rr.status = "approved"
-        rr.save()
+        # Заявка, затем выдача — под блокировкой: повторное одобрение не продлит дважды
+        with transaction.atomic():
+            rr = get_object_or_404(self.get_queryset().select_for_update(of=("self",)), pk=pk)
+            if rr.status != "pending":
+                return Response({"detail": "Старая заявка"}, status=400)
+            loan = Loan.objects.select_for_update().get(pk=rr.loan_id)
+            loan.due_at = rr.new_due_at or (loan.due_at + timedelta(days=14))
+            loan.renew_count += 1
+            if loan.status == "overdue" and loan.due_at > timezone.now():
+                loan.status = "active"
+            loan.save()
+            rr.status = "approved"
+            rr.save()
+            notify(
+                [loan.reader_id], "Продление одобрено",
+                f"Новый срок возврата: {timezone.localtime(loan.due_at):%d.%m.%Y}", kind="renewal",
+            )
         return Response({"detail": "Продление одобрено"})
 
     @action(detail=True, methods=["post"])
     def reject(self, request, pk=None):
         require_role(request.user, ("library", "admin"))
-        rr = self.get_object()
-        rr.status = "rejected"
-        rr.save()
+        with transaction.atomic():
+            rr = get_object_or_404(self.get_queryset().select_for_update(of=("self",)), pk=pk)
+            if rr.status != "pending":
+                return Response({"detail": "Старая заявка"}, status=400)
+            rr.status = "rejected"
+            rr.save()
+            notify([rr.loan.reader_id], "Продление отклонено", "Заявка на продление отклонена", kind="renewal")
         return Response({"detail": "Продление отклонено"})
 
 
+# Место, строка участника и удаление из листа ожидания — одним запросом. Счётчик растёт,
+# только если место есть и пользователь ещё не записан, и тогда же вставляется участник.
+JOIN_EVENT_SQL = f"""
+WITH already AS (
+    SELECT 1 FROM {Event.participants.through._meta.db_table} WHERE event_id = %(event)s AND user_id = %(user)s
+), seat AS (
+    UPDATE {Event._meta.db_table} SET participants_count = participants_count + 1, updated_at = %(now)s
+    WHERE id = %(event)s AND (capacity <= 0 OR participants_count < capacity) AND NOT EXISTS (SELECT 1 FROM already)
+    RETURNING id
+), joined AS (
+    INSERT INTO {Event.participants.through._meta.db_table} (event_id, user_id)
+    SELECT id, %(user)s FROM seat
+    ON CONFLICT (event_id, user_id) DO NOTHING
+    RETURNING 1
+), dequeued AS (
+    DELETE FROM {EventWaitlist._meta.db_table}
+    WHERE event_id = %(event)s AND user_id = %(user)s AND EXISTS (SELECT 1 FROM joined)
+)
+SELECT EXISTS (SELECT 1 FROM already), EXISTS (SELECT 1 FROM seat), EXISTS (SELECT 1 FROM joined)
+"""
+
+# Запись в лист ожидания (повторная не дублируется) и место в нём
+WAITLIST_SQL = f"""
+WITH entry AS (
+    INSERT INTO {EventWaitlist._meta.db_table} (event_id, user_id, created_at)
+    VALUES (%(event)s, %(user)s, %(now)s)
+    ON CONFLICT (event_id, user_id) DO NOTHING
+    RETURNING created_at
+), mine AS (
+    SELECT created_at FROM entry
+    UNION ALL
+    SELECT created_at FROM {EventWaitlist._meta.db_table} WHERE event_id = %(event)s AND user_id = %(user)s
+)
+SELECT (SELECT count(*) FROM entry) + (
+    SELECT count(*) FROM {EventWaitlist._meta.db_table}
+    WHERE event_id = %(event)s AND created_at <= (SELECT min(created_at) FROM mine)
+)
+"""
+
+
+def join_event(event_pk, user_pk):
+    """Seat the user if the event has a free seat: "seated", "already" or "full".
+
+    One guarded statement: the conditional UPDATE of participants_count
+    feeds the participant INSERT, so a seat is never counted without its
+    row. capacity <= 0 means unlimited. Call inside a transaction.
+    """
+    params = {"event": event_pk, "user": user_pk, "now": timezone.now()}
+    with connection.cursor() as cursor:
+        cursor.execute(JOIN_EVENT_SQL, params)
+        already, seated, joined = cursor.fetchone()
+    if seated and not joined:
+        # та же запись пришла параллельно и вставила строку первой: откатываем счётчик
+        raise IntegrityError("event participant already exists")
+    if already:
+        return "already"
+    return "seated" if seated else "full"
+
+
+def join_waitlist(event_pk, user_pk):
+    """Queue the user for the event (once); returns the 1-based position in the queue."""
+    with connection.cursor() as cursor:
+        cursor.execute(WAITLIST_SQL, {"event": event_pk, "user": user_pk, "now": timezone.now()})
+        return cursor.fetchone()[0]
+
+
 class EventViewSet(viewsets.ModelViewSet):
-    queryset = Event.objects.prefetch_related("participants").all()
+    queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
 
+    @cache_response(ttl=60, scopes=("events",))
+    @conditional(events_validators)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(event_validators)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=["post"])
     def register(self, request, pk=None):
         event = self.get_object()
         user = request.user
-        # Проверка мест
-        seats = event.seats_left()
-        if seats is not None and seats <= 0:
-            return Response({"detail": "Мест нет"}, status=400)
-        event.participants.add(user)
-        # Можно добавить уведомление
-        Notification.objects.create(user=user, title="Регистрация на мероприятие", message=f"Вы записаны на {event.title}")
+        position = None
+        try:
+            with transaction.atomic():
+                outcome = join_event(event.pk, user.pk)
+                if outcome == "full":
+                    # Мест нет: решаем под блокировкой события, чтобы не разминуться
+                    # с одновременной отменой записи (unregister держит ту же блокировку)
+                    Event.objects.select_for_update().filter(pk=event.pk).values_list("pk").first()
+                    outcome = join_event(event.pk, user.pk)
+                    if outcome == "full":
+                        position = join_waitlist(event.pk, user.pk)
+        except IntegrityError:
+            # та же запись пришла параллельно и успела первой
+            outcome = "already"
+        if outcome == "already":
+            return Response({"detail": "Вы уже записаны"}, status=400)
+        invalidate("events")
+
+        if outcome == "full":
+            return Response({"detail": "Мест нет, вы в листе ожидания", "waitlist_position": position}, status=202)
+        notify([user.pk], "Регистрация на мероприятие", f"Вы записаны на {event.title}", kind="event")
         return Response({"detail": "Запись успешна"})
 
     @action(detail=True, methods=["post"])
     def unregister(self, request, pk=None):
         event = self.get_object()
         user = request.user
-        event.participants.remove(user)
+        promoted = None
+        with transaction.atomic():
+            Event.objects.select_for_update().filter(pk=event.pk).values_list("pk").first()
+            removed, _ = Event.participants.through.objects.filter(event_id=event.pk, user_id=user.pk).delete()
+            if not removed:
+                EventWaitlist.objects.filter(event=event, user=user).delete()
+            else:
+                # Освободившееся место сразу получает первый из листа ожидания
+                promoted = EventWaitlist.objects.filter(event=event).order_by("created_at", "id").first()
+                if promoted:
+                    Event.participants.through.objects.create(event_id=event.pk, user_id=promoted.user_id)
+                    promoted.delete()
+                else:
+                    Event.objects.filter(pk=event.pk).update(
+                        participants_count=F("participants_count") - 1, updated_at=timezone.now()
+                    )
+        invalidate("events")
+        if promoted:
+            notify(
+                [promoted.user_id], "Регистрация на мероприятие",
+                f"Освободилось место, вы записаны на {event.title}", kind="event",
+            )
         return Response({"detail": "Отмена записи"})
 
     @action(detail=False, methods=["get"], url_path="me")
@@ -281,6 +662,33 @@ class EventViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Own notifications, newest first, a page at a time: GET /api/notifications/?unread=1"""
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    # как notification_user_idx (user, created_at, id)
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        qs = Notification.objects.filter(user=self.request.user).order_by(*self.cursor_ordering)
+        if self.request.query_params.get("unread") in ("1", "true"):
+            qs = qs.filter(read=False)
+        return qs
+
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        return Response({"unread": unread_count(request.user)})
+
+    @action(detail=False, methods=["post"])
+    def mark_read(self, request):
+        """Body: {"ids": [1, 2]} — отметить выбранные; без ids — все."""
+        ids = request.data.get("ids")
+        if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+            raise ValidationError({"ids": "Ожидается список id"})
+        changed = mark_read(request.user, ids)
+        return Response({"marked": changed, "unread": unread_count(request.user)})
+
+
 class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.select_related("user", "book_group").all()
     serializer_class = ReviewSerializer
@@ -315,15 +723,85 @@ class ReviewViewSet(viewsets.ModelViewSet):
 class AnalyticsViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
+    TOP_PERIODS = {"all": "total_issues", "30": "issues_30d", "90": "issues_90d"}
+
     @action(detail=False, methods=["get"])
+    @cache_response(ttl=600, scopes=("catalog", "stats"))
     def top_books(self, request):
-        from django.db.models import Count
-        qs = BookGroup.objects.annotate(issues=Count("copies__loans")).order_by("-issues")[:20]
-        data = []
-        for bg in qs:
-            data.append({
-                "book_group_id": bg.id,
-                "title": bg.title,
-                "issues": bg.issues
-            })
+        """Самые выдаваемые книги: ?period=all|30|90 (дней), читается из BookGroupStats."""
+        field = self.TOP_PERIODS.get(request.query_params.get("period", "all"))
+        if field is None:
+            raise ValidationError({"period": f"Допустимые значения: {', '.join(self.TOP_PERIODS)}"})
+        rows = (
+            BookGroupStats.objects.order_by(f"-{field}")
+            .values_list("book_group_id", "book_group__title", field)[:20]
+        )
+        data = [{"book_group_id": pk, "title": title, "issues": issues} for pk, title, issues in rows]
         return Response(data)
+
+    # --- Отчёты: один сгруппированный запрос на отчёт, результат кешируется на ANALYTICS_CACHE_TTL ---
+
+    REPORT_DAYS = 90
+
+    def _range(self, request):
+        """[from, to) из параметров; по умолчанию — последние REPORT_DAYS дней до конца сегодняшнего дня."""
+        end = datetime_param(request, "to")
+        if end is None:
+            tomorrow = timezone.localdate() + timedelta(days=1)
+            end = timezone.make_aware(datetime.combine(tomorrow, time.min))
+        start = datetime_param(request, "from") or end - timedelta(days=self.REPORT_DAYS)
+        if start >= end:
+            raise ValidationError({"from": "Начало периода должно быть раньше конца"})
+        return start, end
+
+    def _bucket(self, request):
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in analytics.BUCKETS:
+            raise ValidationError({"bucket": f"Допустимые значения: {', '.join(analytics.BUCKETS)}"})
+        return bucket
+
+    def _report(self, request, name, func, **params):
+        require_role(request.user, ("library", "admin"))
+        start, end = self._range(request)
+        key = ":".join(
+            ["analytics", name, start.isoformat(), end.isoformat()]
+            + [f"{k}={v}" for k, v in sorted(params.items())]
+        )
+        results = cache.get(key)
+        if results is None:
+            results = func(start, end, **params)
+            cache.set(key, results, settings.ANALYTICS_CACHE_TTL)
+        return Response({"from": start, "to": end, **params, "results": results})
+
+    def _limit(self, request):
+        return min(max(int_param(request, "limit") or 20, 1), 100)
+
+    @action(detail=False, methods=["get"])
+    def loans(self, request):
+        """Выдачи по дням/неделям/месяцам: ?from=&to=&bucket=day|week|month"""
+        return self._report(request, "loans", analytics.loans_per_period, bucket=self._bucket(request))
+
+    @action(detail=False, methods=["get"])
+    def overdue(self, request):
+        """Доля просроченных выдач по периоду выдачи: ?from=&to=&bucket="""
+        return self._report(request, "overdue", analytics.overdue_rate, bucket=self._bucket(request))
+
+    @action(detail=False, methods=["get"])
+    def loan_duration(self, request):
+        """Средняя и максимальная длительность выдачи (дни): ?from=&to=&bucket="""
+        return self._report(request, "loan_duration", analytics.loan_duration, bucket=self._bucket(request))
+
+    @action(detail=False, methods=["get"])
+    def renewals(self, request):
+        """Книги с наибольшим числом заявок на продление: ?from=&to=&limit="""
+        return self._report(request, "renewals", analytics.renewals_per_book, limit=self._limit(request))
+
+    @action(detail=False, methods=["get"])
+    def events(self, request):
+        """Записавшиеся на мероприятия периода: ?from=&to="""
+        return self._report(request, "events", analytics.event_attendance)
+
+    @action(detail=False, methods=["get"])
+    def genres(self, request):
+        """Популярность жанров по выдачам: ?from=&to=&limit="""
+        return self._report(request, "genres", analytics.genre_popularity, limit=self._limit(request))
@@ -1,6 +1,7 @@
 // src/api/admin.ts
 import axios from 'axios'; // Или ваш настроенный инстанс
 // import { apiInstance } from './index'; 
+import { fetchAllPages } from './pagination';
 
 const BASE_URL = 'https://truly-economic-vervet.cloudpub.ru/api'; // Замените на ваш URL
 
@@ -17,10 +18,9 @@ export const adminApi = {
     return response.data;
   },
 
-  // Получить всех пользователей
+  // Получить всех пользователей (сервер отдаёт страницами, идём по next)
   getAllUsers: async () => {
-    const response = await axios.get(`${BASE_URL}/users/`, getAuthHeaders());
-    return response.data;
+    return fetchAllPages<any>(`${BASE_URL}/users/`, localStorage.getItem('access_token'));
   },
 
   // Удалить пользователя
@@ -1,6 +1,7 @@
 // src/api/books.ts
 import { API_BASE_URL } from "../config"; // Убедитесь, что путь к config верный
 import type { IBookGroup } from "../modules";
+import { fetchAllPages } from "./pagination";
 
 const BOOK_GROUPS_URL = `${API_BASE_URL}/book-groups/`;
 const BOOK_COPIES_URL = `${API_BASE_URL}/book-copies/`;
@@ -27,16 +28,13 @@ export interface IIssueBookPayload {
 
 // --- Функции API ---
 
-// 1. Получить список всех групп книг (для автокомплита)
+// 1. Получить список всех групп книг (для автокомплита), все страницы подряд
 export const fetchBookGroups = async (token: string): Promise<IBookGroup[]> => {
-    const res = await fetch(BOOK_GROUPS_URL, {
-        headers: { Authorization: `Bearer ${token}` },
-    });
-
-    if (!res.ok) {
+    try {
+        return await fetchAllPages<IBookGroup>(BOOK_GROUPS_URL, token);
+    } catch {
         throw new Error("Не удалось загрузить список книг");
     }
-    return res.json();
 };
 
 // 2. Создать новую группу книг (JSON) - БЕЗ картинки
@@ -1,5 +1,6 @@
 // src/api/events.ts
 import { API_BASE_URL } from "../config";
+import { fetchAllPages } from "./pagination";
 
 export const EVENTS_URL = `${API_BASE_URL}/events/`;
 
@@ -28,11 +29,11 @@ export interface IEventResponse {
 }
 
 export const fetchEvents = async (token: string): Promise<IEventResponse[]> => {
-  const res = await fetch(EVENTS_URL, {
-    headers: { Authorization: `Bearer ${token}` },
-  });
-  if (!res.ok) throw new Error("Не удалось получить список мероприятий");
-  return res.json();
+  try {
+    return await fetchAllPages<IEventResponse>(EVENTS_URL, token);
+  } catch {
+    throw new Error("Не удалось получить список мероприятий");
+  }
 };
 
 export const createEvent = async (token: string, data: IEventPayload): Promise<IEventResponse> => {
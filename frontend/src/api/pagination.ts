@@ -0,0 +1,47 @@
+// src/api/pagination.ts
+import { API_BASE_URL } from "../config";
+
+// Списки API отдаются страницами: { next, previous, results }
+export interface IPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Самая большая страница, которую отдаёт сервер (KeysetPagination.max_page_size)
+export const MAX_PAGE_SIZE = 500;
+
+// Ссылки next/previous строит сервер; за прокси у них может быть не та схема или хост,
+// поэтому берём из них только путь и курсор
+const sameOrigin = (url: string): string => {
+  const link = new URL(url, API_BASE_URL);
+  return `${new URL(API_BASE_URL).origin}${link.pathname}${link.search}`;
+};
+
+// Одна страница списка: url — адрес эндпоинта или ссылка next из предыдущей страницы
+export const fetchPage = async <T>(url: string, token?: string | null): Promise<IPage<T>> => {
+  const headers: Record<string, string> = { "Content-Type": "application/json" };
+  if (token) headers.Authorization = `Bearer ${token}`;
+
+  const res = await fetch(sameOrigin(url), { headers });
+  if (!res.ok) {
+    const txt = await res.text().catch(() => "");
+    throw new Error(txt || `HTTP ${res.status}`);
+  }
+  return res.json();
+};
+
+// Весь список: идём по ссылкам next крупными страницами
+export const fetchAllPages = async <T>(url: string, token?: string | null): Promise<T[]> => {
+  const first = new URL(url, API_BASE_URL);
+  first.searchParams.set("page_size", String(MAX_PAGE_SIZE));
+
+  const rows: T[] = [];
+  let next: string | null = first.toString();
+  while (next) {
+    const page: IPage<T> = await fetchPage<T>(next, token);
+    rows.push(...page.results);
+    next = page.next;
+  }
+  return rows;
+};
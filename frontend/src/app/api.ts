@@ -86,8 +86,10 @@ export const api = createApi({
     }),
 
     // Примеры: получить список событий (опционально, если понадобятся later)
+    // список отдаётся страницами; здесь — только первая
     getEvents: build.query<any[], void>({
       query: () => ({ url: '/events/', method: 'GET' }),
+      transformResponse: (page: { results: any[] }) => page.results,
       providesTags: ['Event'],
     }),
     // можно добавить другие endpoint'ы по необходимости
@@ -6,6 +6,7 @@ import CreateEventModal from '../components/modals/CreateEventModal';
 import EditEventModal from '../components/modals/EditEventModal';
 import { useAppSelector } from '../hooks';
 import { API_BASE_URL } from '../config';
+import { fetchAllPages } from '../api/pagination';
 import type { IEvent, IEventWithAvailability } from '../modules';
 
 type ViewMode = 'all' | 'mine';
@@ -43,17 +44,9 @@ export default function EventsPage() {
     const fetchEvents = async () => {
         setLoading(true);
         try {
-            const headers: Record<string, string> = { 'Content-Type': 'application/json' };
-            if (token) headers.Authorization = `Bearer ${token}`;
-
-            const res = await fetch(`${API_BASE_URL}/events/`, { headers });
-            if (!res.ok) {
-                const txt = await res.text().catch(() => '');
-                throw new Error(txt || `HTTP ${res.status}`);
-            }
-
-            const data: IEvent[] = await res.json();
-            setEvents(Array.isArray(data) ? data : []);
+            // список отдаётся страницами — собираем все
+            const data = await fetchAllPages<IEvent>(`${API_BASE_URL}/events/`, token);
+            setEvents(data);
         } catch (err: any) {
             console.error('[EventsPage] fetchEvents error:', err);
             setEvents([]);
@@ -70,18 +63,11 @@ export default function EventsPage() {
             return;
         }
         try {
-            const res = await fetch(`${API_BASE_URL}/events/me/`, {
-                headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'application/json' },
-            });
-            if (!res.ok) {
-                const txt = await res.text().catch(() => '');
-                throw new Error(txt || `HTTP ${res.status}`);
-            }
-            const data: IEvent[] = await res.json();
-            setMyEvents(Array.isArray(data) ? data : []);
+            const data = await fetchAllPages<IEvent>(`${API_BASE_URL}/events/me/`, token);
+            setMyEvents(data);
 
             // Update registeredIds from response
-            const ids = (Array.isArray(data) ? data : []).map(d => d.id);
+            const ids = data.map(d => d.id);
             setRegisteredIds(ids);
         } catch (err: any) {
             console.error('[EventsPage] fetchMyEvents error:', err);
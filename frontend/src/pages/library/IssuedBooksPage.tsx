@@ -2,6 +2,7 @@
 import React, { useEffect, useState } from 'react';
 import { useAppSelector } from '../../hooks';
 import { API_BASE_URL } from '../../config';
+import { fetchPage } from '../../api/pagination';
 
 interface ICopy {
   id: number;
@@ -35,6 +36,8 @@ export default function IssuedBooksPage() {
   const user = useAppSelector(s => s.auth.user);
 
   const [loans, setLoans] = useState<ILoan[]>([]);
+  // ссылка на следующую страницу выдач (null — загружено всё)
+  const [next, setNext] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [processingIds, setProcessingIds] = useState<number[]>([]);
   const [error, setError] = useState<string | null>(null);
@@ -42,23 +45,22 @@ export default function IssuedBooksPage() {
   useEffect(() => {
     if (!token) {
       setLoans([]);
+      setNext(null);
       return;
     }
     fetchLoans();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [token]);
 
-  const fetchLoans = async () => {
+  // Без url — первая страница, иначе дописываем страницу по ссылке next
+  const fetchLoans = async (url?: string) => {
     setLoading(true);
     setError(null);
     try {
-      const res = await fetch(`${API_BASE_URL}/loans/`, {
-        headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'application/json' },
-      });
-      if (!res.ok) throw new Error(await res.text());
-      const data: ILoan[] = await res.json();
-      // Отфильтруем сразу: показываем только не возвращённые
-      setLoans(Array.isArray(data) ? data.filter(l => l.status !== 'returned') : []);
+      // Фильтруем на сервере: показываем только не возвращённые
+      const page = await fetchPage<ILoan>(url ?? `${API_BASE_URL}/loans/?status=active,overdue`, token);
+      setLoans(prev => (url ? [...prev, ...page.results] : page.results));
+      setNext(page.next);
     } catch (err: any) {
       console.error('[IssuedBooksPage] fetchLoans', err);
       setError(err?.message || 'Ошибка загрузки');
@@ -80,8 +82,8 @@ export default function IssuedBooksPage() {
         body: JSON.stringify({}), // минимальный payload, если сервер требует
       });
       if (!res.ok) throw new Error(await res.text());
-      // Обновляем список после возврата
-      await fetchLoans();
+      // Убираем возвращённую выдачу, не перечитывая уже загруженные страницы
+      setLoans(prev => prev.filter(l => l.id !== loan.id));
     } catch (err: any) {
       console.error('[IssuedBooksPage] mark_returned', err);
       alert(err?.message || 'Не удалось отметить возврат');
@@ -134,6 +136,12 @@ export default function IssuedBooksPage() {
           );
         })}
       </div>
+
+      {next && (
+        <button className="btn" onClick={() => fetchLoans(next)} disabled={loading} style={{ marginTop: 12 }}>
+          {loading ? 'Загрузка...' : 'Показать ещё'}
+        </button>
+      )}
     </div>
   );
 }
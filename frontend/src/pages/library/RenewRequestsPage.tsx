@@ -2,6 +2,7 @@
 import React, { useEffect, useState } from 'react';
 import { useAppSelector } from '../../hooks';
 import { API_BASE_URL } from '../../config';
+import { fetchPage } from '../../api/pagination';
 
 interface ICopy {
   id: number;
@@ -42,24 +43,22 @@ export default function RenewRequestsPage() {
   const token = useAppSelector(s => s.auth.access);
   const user = useAppSelector(s => s.auth.user);
   const [requests, setRequests] = useState<IRenewRequest[]>([]);
+  // ссылка на следующую страницу заявок (null — загружено всё)
+  const [next, setNext] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [processing, setProcessing] = useState<number[]>([]);
   const [error, setError] = useState<string | null>(null);
 
-  // Загружаем только pending-заявки
-  const fetchRequests = async () => {
+  // Загружаем только pending-заявки (фильтр на сервере): без url — первую страницу,
+  // иначе дописываем страницу по ссылке next
+  const fetchRequests = async (url?: string) => {
     if (!token) return;
     setLoading(true);
     setError(null);
     try {
-      const res = await fetch(`${API_BASE_URL}/renew-requests/`, {
-        headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'application/json' },
-      });
-      if (!res.ok) throw new Error(await res.text());
-      const data: IRenewRequest[] = await res.json();
-      // Покажем только pending (защита от возвращения уже обработанных)
-      const pending = (Array.isArray(data) ? data : []).filter(r => r.status === 'pending');
-      setRequests(pending);
+      const page = await fetchPage<IRenewRequest>(url ?? `${API_BASE_URL}/renew-requests/?status=pending`, token);
+      setRequests(prev => (url ? [...prev, ...page.results] : page.results));
+      setNext(page.next);
     } catch (err: any) {
       console.error('[RenewRequestsPage] fetch', err);
       setError(err?.message || 'Ошибка загрузки');
@@ -71,6 +70,7 @@ export default function RenewRequestsPage() {
   useEffect(() => {
     if (!token) {
       setRequests([]);
+      setNext(null);
       return;
     }
     fetchRequests();
@@ -208,6 +208,12 @@ export default function RenewRequestsPage() {
           );
         })}
       </div>
+
+      {next && (
+        <button className="btn" onClick={() => fetchRequests(next)} disabled={loading} style={{ marginTop: 12 }}>
+          {loading ? 'Загрузка...' : 'Показать ещё'}
+        </button>
+      )}
     </div>
   );
 }